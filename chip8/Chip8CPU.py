@@ -9,17 +9,20 @@ TODO: Further refactor the code
 TODO: Add Super Chip-8 features
 """
 
+import mmap
+import os
 import random
 import sys
-from typing import Dict
-
+import time
+from array import array
 import pygame
 
 from .Chip8Debugger import Chip8Debugger
 from .Chip8Display import Chip8Display
-from .config import (CLOCK_SPEED, DEBUG, DISPLAY_HEIGHT, DISPLAY_WIDTH,
-                     FONT_ADDR_START, FONT_SET, KEY_MAPPINGS, MEMORY_SIZE,
-                     NUM_REGISTERS, STACK_SIZE, START_ADDR, TIMER_SPEED)
+from .config import (CLOCK_SPEED_HZ, DEBUG, DISPLAY_HEIGHT, DISPLAY_WIDTH,
+                     FONT_ADDR_START, FONT_SET, FRAME_PERIOD_NS, KEY_MAPPINGS,
+                     MEMORY_SIZE, NUM_REGISTERS, OPCODE_STRUCT, PYGAME_TO_CHIP8,
+                     STACK_SIZE, START_ADDR, TIMER_SPEED_HZ)
 
 
 class InvalidLookup(Exception):
@@ -36,6 +39,24 @@ class DataTooLarge(Exception):
 
 # CPU class
 class Chip8CPU:
+    # Fixed attribute layout, every access is a slot load rather than a dict lookup
+    __slots__ = (
+        "STACK_SIZE", "MEMORY_SIZE", "NUM_REGISTERS", "START_ADDR",
+        "DISPLAY_WIDTH", "DISPLAY_HEIGHT", "CLOCK_SPEED_HZ", "TIMER_SPEED_HZ",
+        "CYCLES_PER_FRAME", "FRAME_PERIOD_NS", "FONT_ADDR_START", "FONT_SET",
+        "KEY_MAPPINGS", "PYGAME_TO_CHIP8", "DEBUG", "debugger", "memory", "V",
+        "I", "sp", "pc", "stack", "dt", "st", "next_frame_ns", "display",
+        "keys_pressed", "_rng", "decoded",
+    )
+    
+    # Address of the font sprite for each hexadecimal digit, 5 bytes per sprite
+    FONT_ADDRS = tuple(FONT_ADDR_START + digit * 5 for digit in range(16))
+    
+    # BCD digits of every byte value, hundreds first
+    BCD_TABLE = tuple(
+        bytes((value // 100, (value // 10) % 10, value % 10)) for value in range(256)
+    )
+
     def __init__(self):
         
         ###########################
@@ -49,14 +70,20 @@ class Chip8CPU:
         self.DISPLAY_WIDTH = DISPLAY_WIDTH
         self.DISPLAY_HEIGHT = DISPLAY_HEIGHT
         
-        self.CLOCK_SPEED = CLOCK_SPEED
-        self.TIMER_SPEED = TIMER_SPEED
+        self.CLOCK_SPEED_HZ = CLOCK_SPEED_HZ
+        self.TIMER_SPEED_HZ = TIMER_SPEED_HZ
+        
+        # Instructions executed between each timer update
+        self.CYCLES_PER_FRAME = round(self.CLOCK_SPEED_HZ / self.TIMER_SPEED_HZ)
+        
+        self.FRAME_PERIOD_NS = FRAME_PERIOD_NS
         
         
         self.FONT_ADDR_START = FONT_ADDR_START
         self.FONT_SET = FONT_SET
         
         self.KEY_MAPPINGS = KEY_MAPPINGS
+        self.PYGAME_TO_CHIP8 = PYGAME_TO_CHIP8
         
         self.DEBUG = DEBUG
 
@@ -64,108 +91,77 @@ class Chip8CPU:
         # VARIABLES
         ###########################
         
-        if self.DEBUG:
-            self.debugger = Chip8Debugger(self)
+        # main_loop only ticks the debugger when DEBUG is set
+        self.debugger = Chip8Debugger(self) if self.DEBUG else None
         
-        pygame.init()
+        self.memory = bytearray(self.MEMORY_SIZE)
         
-        self.memory = [0] * self.MEMORY_SIZE
+        self.V = bytearray(self.NUM_REGISTERS)  # General purpose registers
         
-        self.registers =  {
-            "v" : [0] * self.NUM_REGISTERS, # General purpose registers
-            "i" : 0x0000,                   # 2 byte address register
-            "sp": 0x00,                     # Stack pointer
-            "pc": self.START_ADDR,          # Program counter
-        }
+        self.stack = array("H", [0] * self.STACK_SIZE)
         
-        self.stack = [0] * self.STACK_SIZE
-
-        self.timers = {
-            "delay": 0x00,
-            "sound": 0x00,  
-        }
+        # Deadline of the current frame, from time.perf_counter_ns()
+        self.next_frame_ns = 0
         
-        self.clock_ticks = 0
+        self.display = None
         
-        self.timer_ticks = 0
+        # Keyboard state, read once per frame in handle_pygame_events
+        self.keys_pressed = None
         
-        self.display = None
+        self._rng = random.Random()
+        
+        # Decoded opcodes indexed by address, filled lazily as instructions execute
+        self.decoded = [None] * self.MEMORY_SIZE
 
-        # self.load_fontset()
+        self.reset()
 
-        ###########################
-        # OPCODE LOOKUP TABLES
-        ###########################
-        
+    def reset(self):
+        """
+        Restore memory, registers, stack and timers to their power-on state.
+        The existing buffers are kept and overwritten through slice assignment,
+        so references to memory, V, stack and decoded stay valid.
         """
-        Not all opcodes can be identified by the first nibble.
-        So some opcodes are sent to another function to handle looking up the correct opcode.
-        """
-        
-        self.opcode_first_nibble_lookup = {
-            0x0: self.lookup_opcode_0x0,
-            0x1: self.jump_addr,
-            0x2: self.call_addr,
-            0x3: self.skip_reg_eq_byte,
-            0x4: self.skip_reg_neq_byte,
-            0x5: self.skip_reg_eq_reg,
-            0x6: self.ld_to_reg,
-            0x7: self.add_byte_to_reg,
-            0x8: self.lookup_opcode_0x8,
-            0x9: self.skip_reg_neq_reg,
-            0xA: self.ld_i,
-            0xB: self.jump_addr,
-            0xC: self.store_rnd_anded_byte_to_reg,
-            0xD: self.draw_bytes,
-            0xE: self.lookup_opcode_0xE,
-            0xF: self.lookup_opcode_0xF,
-        }
-        
-        self.opcode_0x0_last_byte_lookup = {
-            0xE0: self.clear_screen,
-            0xEE: self.return_from_subrtn,
-        }
-        
-        self.opcode_0x8_fourth_nibble_lookup = {
-            0x0: self.ld_reg_to_reg,
-            0x1: self.or_regs,
-            0x2: self.and_regs,
-            0x3: self.xor_regs,
-            0x4: self.add_regs,
-            0x5: self.sub_regs,
-            0x6: self.right_shift_reg,
-            0x7: self.reverse_sub_regs,
-            0xE: self.left_shift_reg
-        }
-        
-        self.opcode_0xE_last_byte_lookup = {
-            0x9E: self.skip_on_keypress,
-            0xA1: self.skip_on_not_keypress
-        }
-        
-        self.opcode_0xF_last_byte_lookup = {
-            0x07: self.ld_reg_with_dly_timer,
-            0x0A: self.wait_for_input,
-            0x15: self.ld_delay_timer_with_reg,
-            0x18: self.ld_sound_timer_with_reg,
-            0x1E: self.add_i_with_reg,
-            0x29: self.ld_i_font_sprite,
-            0x33: self.ld_i_bcd_of_reg,
-            0x55: self.store_regs_at_i,
-            0x65: self.ld_regs_at_i
-        }
         
+        self.memory[:] = bytes(self.MEMORY_SIZE)
+        self.decoded[:] = [None] * self.MEMORY_SIZE
+        
+        self.V[:] = bytes(self.NUM_REGISTERS)
+        self.I  = 0x0000                        # 2 byte address register
+        self.sp = 0x00                          # Stack pointer
+        self.pc = self.START_ADDR               # Program counter
         
+        self.stack[:] = array("H", [0] * self.STACK_SIZE)
+
+        self.dt = 0x00                          # Delay timer
+        self.st = 0x00                          # Sound timer
+        
+        self.load_fontset()
+
     def load_rom(self, file_path):
         """
         Load the rom into the internal memory.
+        The file is memory mapped and copied straight into memory, without
+        reading it into an intermediate bytes object first.
 
         :param file_path: Path to the rom file.
         """
         
         with open(file_path, "rb") as f:
-            rom_data = f.read()
-            self.load_memory(self.START_ADDR, rom_data)
+            # Empty files cannot be mapped, and there is nothing to load
+            if not os.fstat(f.fileno()).st_size:
+                return
+            
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as rom_data:
+                self.load_rom_bytes(rom_data)
+
+    def load_rom_bytes(self, rom_data):
+        """
+        Load a rom that is already in memory at the start address.
+
+        :param rom_data: Bytes-like object containing the rom.
+        """
+        
+        self.load_memory(self.START_ADDR, rom_data)
        
     def load_memory(self, start_addr, data):
         """
@@ -176,8 +172,9 @@ class Chip8CPU:
         """
         
         self.validate_data_size(start_addr, data)
-        for i in range(len(data)):
-            self.memory[start_addr + i] = data[i]
+        self.memory[start_addr : start_addr + len(data)] = data
+        
+        self.invalidate_decoded(start_addr, len(data))
 
     def validate_data_size(self, start_addr, data):
         """
@@ -193,191 +190,166 @@ class Chip8CPU:
 
     def main_loop(self):
         self.create_display()
-        self.init_clocks()
+        
+        self.next_frame_ns = time.perf_counter_ns()
         
         while True:
             self.handle_pygame_events()
             
+            # Run a frame worth of instructions between each timer update
             if self.DEBUG:
-                self.debugger.run()
+                for _ in range(self.CYCLES_PER_FRAME):
+                    self.debugger.tick()
+                    self.emulate_cyle()
+            else:
+                self.emulate_cycles(self.CYCLES_PER_FRAME)
             
-            self.emulate_cyle()
-            self.update_timers() 
-            self.cpu_clock_delay()
+            self.decrease_timers()
+            self.display.update_display()
+            self.wait_for_next_frame()
 
+    def wait_for_next_frame(self):
+        """
+        Sleep until the next frame is due.
+        
+        Frames are scheduled against fixed nanosecond deadlines so the frame
+        rate does not drift. A frame that overruns its deadline starts the
+        schedule again rather than rushing the following frames.
+        """
+        
+        self.next_frame_ns += self.FRAME_PERIOD_NS
+        
+        delay_ns = self.next_frame_ns - time.perf_counter_ns()
+        if delay_ns > 0:
+            time.sleep(delay_ns / 1_000_000_000)
+        else:
+            self.next_frame_ns = time.perf_counter_ns()
 
     def create_display(self):
         """
         Create a pygame display.
+        pygame is initialised here rather than when the CPU is created, so a
+        CPU that never opens a display does not start SDL.
         """
         
         if self.display is None:
+            pygame.init()
+            
             self.display = Chip8Display(self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT)
             self.display.create_display()
+            
+            self.keys_pressed = pygame.key.get_pressed()
 
-    def init_clocks(self):
-        self.clock_ticks = pygame.time.get_ticks()
-        self.timer_ticks = pygame.time.get_ticks()
-        
     def handle_pygame_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
-                quit()
+                sys.exit()
+        
+        # Snapshot the keyboard once per frame for Ex9E and ExA1
+        self.keys_pressed = pygame.key.get_pressed()
                 
     def emulate_cyle(self):
-        opcode = self.fetch_opcode()
-        self.execute_opcode(opcode)
+        handler, x, y, n, kk, nnn = self.fetch_decoded_opcode()
         
-    def fetch_opcode(self):
+        # Advance past the opcode before executing it, jumps overwrite pc
+        self.pc += 2
+        handler(self, x, y, n, kk, nnn)
+        
+    def emulate_cycles(self, count):
         """
-        Fetch the next opcode from memory.
+        Run several instructions back to back without returning to the main loop.
 
-        :return: The next 2 bytes in memory.
+        :param count: Number of instructions to execute.
         """
         
-        return self.memory[self.registers["pc"] : self.registers["pc"] + 2]
-
-    def execute_opcode(self, opcode):
-        opcode_nibbles = self.get_opcode_nibble_dict(opcode)
-                
-        first_nibble = opcode_nibbles["first"]
+        # Bound to locals so the loop body avoids repeated attribute lookups
+        decoded_cache = self.decoded
+        fetch_decoded_opcode = self.fetch_decoded_opcode
         
-        lookup_function = self.opcode_first_nibble_lookup[first_nibble]
-        lookup_function(opcode_nibbles)
+        for _ in range(count):
+            pc = self.pc
+            handler, x, y, n, kk, nnn = decoded_cache[pc] or fetch_decoded_opcode()
+            
+            self.pc = pc + 2
+            handler(self, x, y, n, kk, nnn)
         
-        # Increase program counter
-        self.registers["pc"] += 2
-
-    def get_opcode_nibble_dict(self, opcode):
-        """
-        Create dictionary of opcode nibbles and masked bits
+    def fetch_opcode(self):
         """
-        
-        # Check if opcode is array
-        if isinstance(opcode, list):
-            combined_opcode = (opcode[0] << 8 | opcode[1]) & 0xFFFF
-        else:
-            combined_opcode = opcode & 0xFFFF
-        
-        opcode_nibbles = {
-            "all"              : combined_opcode,
-            "first"      : (combined_opcode & 0xF000) >> 12,
-            "second"     : (combined_opcode & 0x0F00) >> 8,
-            "third"      : (combined_opcode & 0x00F0) >> 4,
-            "fourth"     : combined_opcode & 0x000F,
-            "last_three": combined_opcode & 0x0FFF,           # 12 bit data, normally addr
-            "last_two"         : combined_opcode & 0x00FF            # Last byte in opcode
-        }
-        
-        return opcode_nibbles
-
-    def update_timers(self):
-        cur_tick = pygame.time.get_ticks()
-        if (cur_tick - self.timer_ticks) >= self.TIMER_SPEED:
-            self.decrease_timers()
-            self.timer_ticks = cur_tick
-
-    def cpu_clock_delay(self):
-        cur_tick = pygame.time.get_ticks()
-        time_delta = cur_tick - self.clock_ticks
-        if time_delta < self.CLOCK_SPEED:
-            pygame.time.delay(self.CLOCK_SPEED - time_delta)
-            self.clock_ticks = cur_tick
+        Fetch the next opcode from memory.
 
-    def decrease_timers(self):
+        :return: The next 2 bytes in memory as a 16 bit opcode.
         """
-        Update the timers.
-        """
-        # cur_time_ms = self.timer_clock.tick()
-        # if not (cur_time_ms >= self.TIMER_SPEED):
-        #     return
         
-        if self.timers["delay"] > 0:
-            self.timers["delay"] -= 1
-        if self.timers["sound"] > 0:
-            self.timers["sound"] -= 1
+        return OPCODE_STRUCT.unpack_from(self.memory, self.pc)[0]
 
-    def lookup_opcode_0x0(self, opcode_nibbles: Dict[str, int]):
+    def fetch_decoded_opcode(self):
         """
-        Lookup opcode beginning with 0x0, running the appropriate function
-        based on the last byte.
+        Fetch the decoded opcode at the program counter, decoding and caching
+        it on first execution.
 
-        :param opcode_nibbles: dict[str, int] of opcode nibbles
+        :return: Tuple of (handler, x, y, n, kk, nnn)
         """
         
-        last_byte = opcode_nibbles["last_two"]
-        self.validate_lookup(self.opcode_0x0_last_byte_lookup, last_byte)
-    
-        function_lookup = self.opcode_0x0_last_byte_lookup[last_byte]
-        function_lookup(opcode_nibbles)
+        decoded = self.decoded[self.pc]
+        if decoded is None:
+            decoded = self.decode_opcode(self.fetch_opcode())
+            self.decoded[self.pc] = decoded
         
-    def lookup_opcode_0x8(self, opcode_nibbles: Dict[str, int]):
-        """
-        Lookup opcode beginning with 0x8, running the appropriate function
-        based on the fourth nibble.
+        return decoded
 
-        :param opcode_nibbles: dict[str, int] of opcode nibbles
+    def decode_opcode(self, opcode):
         """
+        Decode an opcode into its handler and operands.
+
+        :param opcode: 16 bit opcode
         
-        fourth_nibble = opcode_nibbles["fourth"]
-        self.validate_lookup(self.opcode_0x8_fourth_nibble_lookup, fourth_nibble)
-        
-        function_lookup = self.opcode_0x8_fourth_nibble_lookup[fourth_nibble]
-        function_lookup(opcode_nibbles)
+        :return: Tuple of (handler, x, y, n, kk, nnn)
         
-    def lookup_opcode_0xE(self, opcode_nibbles: Dict[str, int]):
-        """
-        Lookup opcode beginning with 0xE, running the appropriate function
-        based on the last byte.
-
-        :param opcode_nibbles: dict[str, int] of opcode nibbles
+        :raises InvalidLookup: If opcode is not a valid instruction
         """
         
-        last_byte = opcode_nibbles["last_two"]
-        self.validate_lookup(self.opcode_0xE_last_byte_lookup, last_byte)
-    
-        function_lookup = self.opcode_0xE_last_byte_lookup[last_byte]
-        function_lookup(opcode_nibbles)
+        decoded = self.DECODE_TABLE[opcode]
+        if decoded is None:
+            raise InvalidLookup(f"0x{opcode:04X} is not a valid opcode.")
         
-    def lookup_opcode_0xF(self, opcode_nibbles: Dict[str, int]):
+        return decoded
+
+    def invalidate_decoded(self, start_addr, length):
         """
-        Lookup opcode beginning with 0xF, running the appropriate function
-        based on the last byte.
+        Drop cached decoded opcodes that overlap a written memory range.
 
-        :param opcode_nibbles: dict[str, int] of opcode nibbles
+        :param start_addr: First address written.
+        :param length: Number of bytes written.
         """
         
-        last_byte = opcode_nibbles["last_two"]
-        self.validate_lookup(self.opcode_0xF_last_byte_lookup, last_byte)
-    
-        function_lookup = self.opcode_0xF_last_byte_lookup[last_byte]
-        function_lookup(opcode_nibbles)
+        # An opcode starting one byte before the range also reads its first byte
+        first_addr = max(start_addr - 1, 0)
+        last_addr = min(start_addr + length, self.MEMORY_SIZE)
+        self.decoded[first_addr:last_addr] = [None] * (last_addr - first_addr)
 
-    def validate_lookup(self, lookup_table, nibble):
+    def decrease_timers(self):
         """
-        Check if a lookup table contains a key for the given nibble.
-        Raise exception if not.
-        
-        :param lookup_table: Lookup table to check
-        :param nibble: Nibble to check
-        
-        :raises InvalidLookup: If nibble is not in lookup table
+        Update the timers.
         """
         
-        try:
-            lookup_table[nibble]
-        except KeyError as e:
-            raise InvalidLookup(f"{nibble} not found in {str(lookup_table)}.") from e
-    
+        if self.dt > 0:
+            self.dt -= 1
+        if self.st > 0:
+            self.st -= 1
+
     def load_fontset(self):
+        """
+        Load the hexadecimal digit sprites into memory at FONT_ADDR_START.
+        """
+        
         self.load_memory(self.FONT_ADDR_START, self.FONT_SET)
 
     ###########################
     # Opcode functions
     ###########################
 
-    def clear_screen(self, opcode_nibbles=None):
+    def clear_screen(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 00E0 - CLS
         
@@ -385,148 +357,126 @@ class Chip8CPU:
         """
 
         self.display.clear_display()
-        self.display.update_display()
         
 
-    def return_from_subrtn(self, opcode_nibbles=None):
+    def return_from_subrtn(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 00EE - RET
         
         Return from a subroutine by popping the stack and setting the program counter to the popped value.
         """
 
-        self.registers["pc"] = self.stack[self.registers["sp"]]
-        self.stack[self.registers["sp"]] = 0
-        self.registers["sp"] -= 1
+        self.pc = self.stack[self.sp]
+        self.stack[self.sp] = 0
+        self.sp -= 1
 
-    def jump_addr(self, opcode_nibbles: Dict[str, int]):
+    def jump_addr(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 1nnn - JP addr
         
         Jump to address nnn.
         """
 
-        self.registers["pc"] = opcode_nibbles["last_three"]
-        self.registers["pc"] -= 2
-        
+        self.pc = nnn
 
-    def call_addr(self, opcode_nibbles: Dict[str, int]):
+    def call_addr(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 2nnn - CALL addr
         
-        Call subroutine at nnn. Push current pc onto stack and jump to nnn.
+        Call subroutine at nnn. Push the return address onto stack and jump to nnn.
         """
 
-        self.registers["sp"] += 1
-        self.stack[self.registers["sp"]] = self.registers["pc"]
-        self.registers["pc"] = opcode_nibbles["last_three"]
-        self.registers["pc"] -= 2        
+        self.sp += 1
+        self.stack[self.sp] = self.pc
+        self.pc = nnn
         
 
-    def skip_reg_eq_byte(self, opcode_nibbles: Dict[str, int]):
+    def skip_reg_eq_byte(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 3xkk - SE Vx, byte
         
         Skip next instruction if Vx = kk.
         """
 
-        if self.registers["v"][opcode_nibbles["second"]] == opcode_nibbles["last_two"]:
-            self.registers["pc"] += 2
+        if self.V[x] == kk:
+            self.pc += 2
             
 
-    def skip_reg_neq_byte(self, opcode_nibbles: Dict[str, int]):
+    def skip_reg_neq_byte(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 4xkk - SNE Vx, byte
         
         Skip next instruction if Vx != kk.
         """
 
-        if self.registers["v"][opcode_nibbles["second"]] != opcode_nibbles["last_two"]:
-            self.registers["pc"] += 2
+        if self.V[x] != kk:
+            self.pc += 2
 
-    def skip_reg_eq_reg(self, opcode_nibbles: Dict[str, int]):
+    def skip_reg_eq_reg(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 5xy0 - SE Vx, Vy
         
         Skip next instruction if Vx = Vy.
         """
 
-        if (
-            self.registers["v"][opcode_nibbles["second"]]
-            == self.registers["v"][opcode_nibbles["third"]]
-        ):
-            self.registers["pc"] += 2
+        if self.V[x] == self.V[y]:
+            self.pc += 2
 
-    def ld_to_reg(self, opcode_nibbles: Dict[str, int]):
+    def ld_to_reg(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 6xkk - LD Vx, byte
         
         Load byte into Vx.
         """
 
-        self.registers["v"][opcode_nibbles["second"]] = opcode_nibbles["last_two"]
+        self.V[x] = kk
 
-    def add_byte_to_reg(self, opcode_nibbles: Dict[str, int]):
+    def add_byte_to_reg(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 7xkk - ADD Vx, byte
         
         Add byte to Vx.
         """
 
-        second_nibble = self.registers["v"][opcode_nibbles["second"]]
-        last_byte = opcode_nibbles["last_two"]
-        
-        temp = second_nibble + last_byte
-        if temp > 255:
-            temp -= 256
-            
-        self.registers["v"][opcode_nibbles["second"]] = temp
+        self.V[x] = (self.V[x] + kk) & 0xFF
 
-    def ld_reg_to_reg(self, opcode_nibbles: Dict[str, int]):
+    def ld_reg_to_reg(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 8xy0 - LD Vx, Vy
         
         Load Vy into Vx.
         """
 
-        self.registers["v"][opcode_nibbles["second"]] = self.registers["v"][
-            opcode_nibbles["third"]
-        ]
+        self.V[x] = self.V[y]
 
-    def or_regs(self, opcode_nibbles: Dict[str, int]):
+    def or_regs(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 8xy1 - OR Vx, Vy
         
         Or Vx and Vy. Set Vx to result.
         """
 
-        self.registers["v"][opcode_nibbles["second"]] |= self.registers["v"][
-            opcode_nibbles["third"]
-        ]
+        self.V[x] |= self.V[y]
 
-    def and_regs(self, opcode_nibbles: Dict[str, int]):
+    def and_regs(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 8xy2 - AND Vx, Vy
         
         And Vx and Vy. Set Vx to result.
         """
 
-        self.registers["v"][opcode_nibbles["second"]] &= self.registers["v"][
-            opcode_nibbles["third"]
-        ]
+        self.V[x] &= self.V[y]
 
-    def xor_regs(self, opcode_nibbles: Dict[str, int]):
+    def xor_regs(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 8xy3 - XOR Vx, Vy
         
         Xor Vx and Vy. Set Vx to result.
         """
 
-        self.registers["v"][opcode_nibbles["second"]] ^= self.registers["v"][
-            opcode_nibbles["third"]
-        ]
+        self.V[x] ^= self.V[y]
 
-    def add_regs(self, opcode_nibbles: Dict[str, int]):
+    def add_regs(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 8xy4 - ADD Vx, Vy
         
@@ -534,22 +484,12 @@ class Chip8CPU:
         Set VF to 1 if there is a carry, 0 otherwise.
         """
 
-        second_nibble = self.registers["v"][opcode_nibbles["second"]]
-        third_nibble = self.registers["v"][opcode_nibbles["third"]]
-
-        temp = second_nibble + third_nibble
-
-        carry = False
-        if (temp > 255):
-            carry = True
-            temp -= 256
-            
-        temp &= 0xFF
-        self.registers["v"][opcode_nibbles["second"]] = temp
-        self.registers["v"][0xF] = 1 if carry else 0
+        total = self.V[x] + self.V[y]
         
+        self.V[x] = total & 0xFF
+        self.V[0xF] = total >> 8                # Carry out of the low byte
 
-    def sub_regs(self, opcode_nibbles: Dict[str, int]):
+    def sub_regs(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 8xy5 - SUB Vx, Vy
         
@@ -557,33 +497,22 @@ class Chip8CPU:
         Set VF to 1 if there is no borrow, 0 otherwise.
         """
 
-        second_nibble = self.registers["v"][opcode_nibbles["second"]]
-        third_nibble = self.registers["v"][opcode_nibbles["third"]]
-        
-        borrow = False
-        if (second_nibble > third_nibble):
-            second_nibble -= third_nibble
-        else:
-            second_nibble = 256 + second_nibble - third_nibble
-            borrow = True
+        difference = self.V[x] - self.V[y]
         
-        second_nibble &= 0xFF
-        self.registers["v"][opcode_nibbles["second"]] = second_nibble
-        
-        self.registers["v"][0xF] = 0 if borrow else 1
+        self.V[x] = difference & 0xFF
+        self.V[0xF] = int(difference > 0)       # No borrow when Vx > Vy
 
-    def right_shift_reg(self, opcode_nibbles: Dict[str, int]):
+    def right_shift_reg(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 8xy6 - SHR Vx {, Vy}
         
         Right shift Vx. Set Vx to result.
         """
 
-        self.registers["v"][0xF] = self.registers["v"][opcode_nibbles["second"]] & 0x1
-        self.registers["v"][opcode_nibbles["second"]] >>= 1
-        self.registers["v"][opcode_nibbles["second"]] &= 0xFF
+        self.V[0xF] = self.V[x] & 0x1
+        self.V[x] >>= 1
 
-    def reverse_sub_regs(self, opcode_nibbles: Dict[str, int]):
+    def reverse_sub_regs(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 8xy7 - SUBN Vx, Vy
         
@@ -591,22 +520,12 @@ class Chip8CPU:
         Set VF to 1 if there is no borrow, 0 otherwise.
         """
 
-        second_nibble = self.registers["v"][opcode_nibbles["second"]]
-        third_nibble = self.registers["v"][opcode_nibbles["third"]]
-
-        borrow = False
-        if (third_nibble > second_nibble):
-            third_nibble -= second_nibble
-        else:
-            third_nibble = 256 + third_nibble - second_nibble
-            borrow = True
-
-        third_nibble &= 0xFF
-        self.registers["v"][opcode_nibbles["second"]] = third_nibble
+        difference = self.V[y] - self.V[x]
         
-        self.registers["v"][0xF] = 0 if borrow else 1
+        self.V[x] = difference & 0xFF
+        self.V[0xF] = int(difference > 0)       # No borrow when Vy > Vx
 
-    def left_shift_reg(self, opcode_nibbles: Dict[str, int]):
+    def left_shift_reg(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 8xyE - SHL Vx {, Vy}
         
@@ -614,99 +533,86 @@ class Chip8CPU:
         Set VF to 1 if most significant bit is set, 0 otherwise.
         """
 
-        self.registers["v"][0xF] = \
-            (self.registers["v"][opcode_nibbles["second"]] & 0x80) >> 7
-            
-        self.registers["v"][opcode_nibbles["second"]] <<= 1
-        self.registers["v"][opcode_nibbles["second"]] &= 0xFF
+        self.V[0xF] = (self.V[x] & 0x80) >> 7
+        self.V[x] = (self.V[x] << 1) & 0xFF
 
-    def skip_reg_neq_reg(self, opcode_nibbles: Dict[str, int]):
+    def skip_reg_neq_reg(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode 9xy0 - SNE Vx, Vy
         
         Skip next instruction if Vx != Vy.
         """
 
-        if (
-            self.registers["v"][opcode_nibbles["second"]]
-            != self.registers["v"][opcode_nibbles["third"]]
-        ):
-            self.registers["pc"] += 2
+        if self.V[x] != self.V[y]:
+            self.pc += 2
 
-    def ld_i(self, opcode_nibbles: Dict[str, int]):
+    def ld_i(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode Annn - LD I, addr
         
         Load I with nnn.
         """
 
-        self.registers["i"] = opcode_nibbles["last_three"]
+        self.I = nnn
 
-    def jmp_reg0_with_byte(self, opcode_nibbles: Dict[str, int]):
+    def jmp_reg0_with_byte(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode Bnnn - JP V0, addr
         
         Jump to location nnn + V0.
         """
 
-        self.registers["pc"] = (opcode_nibbles["last_three"]) + self.registers["v"][0x0]
-        self.registers["pc"] &= 0xFFFF
-        self.registers["pc"] -= 2
+        self.pc = (nnn + self.V[0x0]) & 0xFFFF
 
-    def store_rnd_anded_byte_to_reg(self, opcode_nibbles: Dict[str, int]):
+    def store_rnd_anded_byte_to_reg(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode Cxkk - RND Vx, byte
         
         Set Vx to random byte ANDed with kk.
         """
 
-        self.registers["v"][opcode_nibbles["second"]] = (
-            random.randint(0, 255) & opcode_nibbles["last_two"]
-        )
+        self.V[x] = self._rng.getrandbits(8) & kk
 
-    def draw_bytes(self, opcode_nibbles: Dict[str, int]):
+    def draw_bytes(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode Dxyn - DRW Vx, Vy, nibble
         
         Draws a sprite at coordinate (Vx, Vy) with width 8 pixels and height n pixels.
         """
 
-        num_bytes_to_draw = opcode_nibbles["fourth"]
-        x_pos = self.registers["v"][opcode_nibbles["second"]]
-        y_pos = self.registers["v"][opcode_nibbles["third"]]
-
-        overwritten = False
+        # Slicing would silently return a short sprite past the end of memory
+        if self.I + n > self.MEMORY_SIZE:
+            raise IndexError("Sprite extends past the end of memory.")
 
-        for i in range(num_bytes_to_draw):
-            byte_to_draw = self.memory[self.registers["i"] + i]
-            draw_byte_ret_val = self.display.draw_byte(x_pos, y_pos + i, byte_to_draw)
+        x_pos = self.V[x]
+        y_pos = self.V[y]
+        sprite = self.memory[self.I : self.I + n]
 
-            if draw_byte_ret_val:
-                overwritten = True
+        overwritten = self.display.draw_sprite(x_pos, y_pos, sprite)
 
-        self.registers["v"][0xF] = 1 if overwritten else 0
+        self.V[0xF] = 1 if overwritten else 0
 
-    def skip_on_keypress(self, opcode_nibbles: Dict[str, int]):
+    def skip_on_keypress(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode Ex9E - SKP Vx
         
         Skip next instruction if key with the value of Vx is pressed.
         """
     
-        key = self.registers["v"][opcode_nibbles["second"]]
+        key = self.V[x]
         if self.is_key_pressed(key):
-            self.registers["pc"] += 2
+            self.pc += 2
         
-    def skip_on_not_keypress(self, opcode_nibbles: Dict[str, int]):
+    def skip_on_not_keypress(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode ExA1 - SKNP Vx
         
         Skip next instruction if key with the value of Vx is not pressed.
         """
         
-        key = self.registers["v"][opcode_nibbles["second"]]
+        key = self.V[x]
         if not self.is_key_pressed(key):
-            self.registers["pc"] += 2
+            self.pc += 2
 
     def is_key_pressed(self, key):
         """
@@ -717,32 +623,29 @@ class Chip8CPU:
         :return: True if key is pressed, False otherwise
         """
         
-        keys_pressed = pygame.key.get_pressed()
+        return bool(self.keys_pressed[self.KEY_MAPPINGS[key]])
 
-        return bool(keys_pressed[self.KEY_MAPPINGS[key]])
-
-    def ld_reg_with_dly_timer(self, opcode_nibbles: Dict[str, int]):
+    def ld_reg_with_dly_timer(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode Fx07 - LD Vx, DT
         
         Load the value of DT into Vx.
         """
 
-        self.registers["v"][opcode_nibbles["second"]] = self.timers["delay"]
+        self.V[x] = self.dt
 
-    def wait_for_input(self, opcode_nibbles: Dict[str, int]):
+    def wait_for_input(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode Fx0A - LD Vx, K
         
         Wait for a key press, store the value of the key in Vx.
         """
         
+        # Show anything drawn this frame before blocking on input
+        self.display.update_display()
+        
         key_pressed = self.wait_and_get_key()
-        # Reverse dictionary lookup to find the key that corresponds to the pressed key
-        for key, value in self.KEY_MAPPINGS.items():
-            if key_pressed == value:
-                self.registers["v"][opcode_nibbles["second"]] = key
-                break
+        self.V[x] = self.PYGAME_TO_CHIP8[key_pressed]
 
     def wait_and_get_key(self):
         """
@@ -751,90 +654,182 @@ class Chip8CPU:
         :return: Key pressed
         """
         while True:
-            for event in pygame.event.get():
-                # Handle quit event
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                # Wait until a valid key is pressed
-                if (event.type == pygame.KEYDOWN) and (event.key in self.KEY_MAPPINGS.values()):
-                    return event.key
+            # Block until the next event instead of polling the queue
+            event = pygame.event.wait()
+            
+            # Handle quit event
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            # Wait until a valid key is pressed
+            if (event.type == pygame.KEYDOWN) and (event.key in self.PYGAME_TO_CHIP8):
+                return event.key
 
-    def ld_delay_timer_with_reg(self, opcode_nibbles: Dict[str, int]):
+    def ld_delay_timer_with_reg(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode Fx15 - LD DT, Vx
         
         Set the delay timer to Vx.
         """
 
-        self.timers["delay"] = self.registers["v"][opcode_nibbles["second"]]
+        self.dt = self.V[x]
 
-    def ld_sound_timer_with_reg(self, opcode_nibbles: Dict[str, int]):
+    def ld_sound_timer_with_reg(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode Fx18 - LD ST, Vx
         
         Set the sound timer to Vx.
         """
-        self.timers["sound"] = self.registers["v"][opcode_nibbles["second"]]
+        self.st = self.V[x]
 
-    def add_i_with_reg(self, opcode_nibbles: Dict[str, int]):
+    def add_i_with_reg(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode Fx1E - ADD I, Vx
         """
 
-        self.registers["i"] += self.registers["v"][opcode_nibbles["second"]]
-        self.registers["i"] &= 0xFFFF
+        self.I = (self.I + self.V[x]) & 0xFFFF
 
-    def ld_i_font_sprite(self, opcode_nibbles: Dict[str, int]):
+    def ld_i_font_sprite(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode Fx29 - LD F, Vx
         
         Set I to the location of the sprite for the character in Vx.
         """
         
-        sprite_char = self.registers["v"][opcode_nibbles["second"]]
-        sprite_char_addr = self.FONT_ADDR_START + (sprite_char * 5)
+        self.I = self.FONT_ADDRS[self.V[x] & 0xF]
 
-    def ld_i_bcd_of_reg(self, opcode_nibbles: Dict[str, int]):
+    def ld_i_bcd_of_reg(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode Fx33 - LD B, Vx
         
         Load the BCD representation of Vx into memory locations I, I+1, and I+2.
         """
 
-        second_nibble = self.registers["v"][opcode_nibbles["second"]]
-        
-        # 100s places
-        self.memory[self.registers["i"]] = (
-            int((second_nibble / 100) % 10) & 0xFF
-        )
-        
-        # 10s place
-        self.memory[self.registers["i"] + 1] = (
-            int((second_nibble / 10) % 10) & 0xFF
-        )
-        
-        # 1s place
-        self.memory[self.registers["i"] + 2] = (
-            int(second_nibble % 10) & 0xFF
-        )
+        self.load_memory(self.I, self.BCD_TABLE[self.V[x]])
 
-    def store_regs_at_i(self, opcode_nibbles: Dict[str, int]):
+    def store_regs_at_i(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode Fx55 - LD [I], Vx
         
         Store registers V0 through Vx in memory starting at location I.
         """
 
-        for i in range(opcode_nibbles["second"] + 1):
-            self.memory[self.registers["i"] + i] = self.registers["v"][i]
+        self.load_memory(self.I, self.V[: x + 1])
 
-    def ld_regs_at_i(self, opcode_nibbles: Dict[str, int]):
+    def ld_regs_at_i(self, x: int, y: int, n: int, kk: int, nnn: int):
         """
         Opcode Fx65 - LD Vx, [I]
         
         Load registers V0 through Vx from memory starting at location I.
         """
 
-        for i in range(opcode_nibbles["second"] + 1):
-            self.registers["v"][i] = self.memory[self.registers["i"] + i]
+        self.validate_data_size(self.I, self.V[: x + 1])
+        self.V[: x + 1] = (
+            self.memory[self.I : self.I + x + 1]
+        )
+
+    ###########################
+    # OPCODE LOOKUP TABLES
+    ###########################
+    
+    """
+    Not all opcodes can be identified by the first nibble.
+    Opcodes beginning with 0x0, 0x8, 0xE and 0xF are resolved through a second
+    lookup table. Every opcode is decoded once into DECODE_TABLE, so dispatch
+    at runtime is a single index and call.
+    """
+    
+    # Indexed by the first nibble, None where a second lookup is needed
+    opcode_first_nibble_lookup = (
+        None,                           # 0x0
+        jump_addr,                      # 0x1
+        call_addr,                      # 0x2
+        skip_reg_eq_byte,               # 0x3
+        skip_reg_neq_byte,              # 0x4
+        skip_reg_eq_reg,                # 0x5
+        ld_to_reg,                      # 0x6
+        add_byte_to_reg,                # 0x7
+        None,                           # 0x8
+        skip_reg_neq_reg,               # 0x9
+        ld_i,                           # 0xA
+        jmp_reg0_with_byte,             # 0xB
+        store_rnd_anded_byte_to_reg,    # 0xC
+        draw_bytes,                     # 0xD
+        None,                           # 0xE
+        None,                           # 0xF
+    )
+    
+    opcode_0x0_last_byte_lookup = {
+        0xE0: clear_screen,
+        0xEE: return_from_subrtn,
+    }
+    
+    # Indexed by the fourth nibble, None where the opcode is invalid
+    opcode_0x8_fourth_nibble_lookup = (
+        ld_reg_to_reg,                  # 0x0
+        or_regs,                        # 0x1
+        and_regs,                       # 0x2
+        xor_regs,                       # 0x3
+        add_regs,                       # 0x4
+        sub_regs,                       # 0x5
+        right_shift_reg,                # 0x6
+        reverse_sub_regs,               # 0x7
+        None, None, None, None, None, None,
+        left_shift_reg,                 # 0xE
+        None,
+    )
+    
+    opcode_0xE_last_byte_lookup = {
+        0x9E: skip_on_keypress,
+        0xA1: skip_on_not_keypress
+    }
+    
+    opcode_0xF_last_byte_lookup = {
+        0x07: ld_reg_with_dly_timer,
+        0x0A: wait_for_input,
+        0x15: ld_delay_timer_with_reg,
+        0x18: ld_sound_timer_with_reg,
+        0x1E: add_i_with_reg,
+        0x29: ld_i_font_sprite,
+        0x33: ld_i_bcd_of_reg,
+        0x55: store_regs_at_i,
+        0x65: ld_regs_at_i
+    }
+
+    @classmethod
+    def build_decode_table(cls):
+        """
+        Decode every 16 bit opcode into its handler and operands.
+
+        :return: Tuple indexed by opcode of (handler, x, y, n, kk, nnn) tuples,
+                 None where the opcode is not a valid instruction.
+        """
+        
+        decode_table = [None] * 0x10000
+        
+        for opcode in range(0x10000):
+            first = (opcode & 0xF000) >> 12
+            x     = (opcode & 0x0F00) >> 8
+            y     = (opcode & 0x00F0) >> 4
+            n     = opcode & 0x000F
+            kk    = opcode & 0x00FF           # Last byte in opcode
+            nnn   = opcode & 0x0FFF           # 12 bit data, normally addr
+            
+            if first == 0x0:
+                handler = cls.opcode_0x0_last_byte_lookup.get(kk)
+            elif first == 0x8:
+                handler = cls.opcode_0x8_fourth_nibble_lookup[n]
+            elif first == 0xE:
+                handler = cls.opcode_0xE_last_byte_lookup.get(kk)
+            elif first == 0xF:
+                handler = cls.opcode_0xF_last_byte_lookup.get(kk)
+            else:
+                handler = cls.opcode_first_nibble_lookup[first]
+            
+            if handler is not None:
+                decode_table[opcode] = (handler, x, y, n, kk, nnn)
+        
+        return tuple(decode_table)
+
+
+Chip8CPU.DECODE_TABLE = Chip8CPU.build_decode_table()
@@ -3,111 +3,168 @@ A debugger for the Chip8 CPU.
 This debugger will act similarly to gdb.
 """
 
-import re
 import sys
 
+from .config import OPCODE_STRUCT
+
 class Chip8Debugger:
+    __slots__ = (
+        "chip8", "breakpoints", "commands", "print_commands", "static_disasm",
+        "halt", "last_input",
+    )
+    
     def __init__(self, Chip8CPU):
         self.chip8 = Chip8CPU
-        self.breakpoints = []
+        self.breakpoints = set()
+        
+        # Command handlers, each returns True if the emulator should resume
+        self.commands = {
+            "b": self._cmd_break,
+            "d": self._cmd_delete,
+            "s": self._cmd_step,
+            "n": self._cmd_step,
+            "p": self._cmd_print,
+            "c": self._cmd_continue,
+            "q": self._cmd_quit,
+        }
         
-        self.valid_commands = ["b", "s", "c", "p", "d", "q"]
+        # Print handlers for the named print targets
+        self.print_commands = {
+            "i": self._print_i,
+            "pc": self._print_pc,
+            "sp": self._print_sp,
+            "stack": self._print_stack,
+            "b": self._print_breakpoints,
+        }
+        
+        # Disassembly of every opcode that does not show register values
+        self.static_disasm = self.build_static_disasm_table()
         
         # Run debugger before launching the emulator
         self.halt = True
         
         self.last_input = ""
             
+    def tick(self):
+        """
+        Called before every instruction. Only a flag and breakpoint check unless
+        the CPU should halt, in which case the interactive prompt is entered.
+        """
+        
+        if self.should_halt():
+            self.run()
+            
     def run(self):
         """
         Main debugger loop
         """
         
-        opcode = self.get_opcode()
-        self.hex_print(self.chip8.registers["pc"], opcode)
-        print("\t", end="")
-        self.print_disassembly(opcode)
+        self.halt = False
         
-        self.halt = self.should_halt()
+        pc = self.chip8.pc
         
-        if self.halt:
-            self.halt = False
-            
-            should_continue = False
-            while not should_continue:
-                command_array = self.get_input()
-                should_continue = self.parse_input(command_array)
-                self.last_input = command_array
+        self.print_instruction(pc, self.get_opcode(pc))
+        
+        should_continue = False
+        while not should_continue:
+            command_array = self.get_input()
+            should_continue = self.parse_input(command_array)
+            self.last_input = command_array
                 
-    def get_opcode(self):
-        return self.chip8.memory[self.chip8.registers["pc"]] << 8 | self.chip8.memory[self.chip8.registers["pc"] + 1]
+    def get_opcode(self, pc):
+        return OPCODE_STRUCT.unpack_from(self.chip8.memory, pc)[0]
 
-    def hex_print(self, addr, opcode):
-        print("0x%04X\t%04X" % (addr, opcode), end="")
-        
-    def print_disassembly(self, opcode):
+    def print_instruction(self, addr, opcode):
         """
-        Print the disassembly of the given opcode.
+        Print the address, opcode and disassembly of an instruction as one write.
         """
         
-        print(self.opcode_lookup(opcode))
+        print("0x%04X\t%04X\t%s" % (addr, opcode, self.opcode_lookup(opcode)))
         
     def opcode_lookup(self, opcode):
+        """
+        Disassemble an opcode, using the precomputed text where there is one.
         
-        # Really ugly way to do this, but it works.
-        
-        disasm_string = ""
-        nibble_dict = self.chip8.get_opcode_nibble_dict(opcode)
-        if nibble_dict["first"] == 0x0:
-            if nibble_dict["last_two"] == 0xE0:
-                disasm_string = "CLS"
-            elif nibble_dict["last_two"] == 0xEE:
-                disasm_string = "RET"
-        elif nibble_dict["first"] == 0x1:
-            disasm_string = "JP " + self.to_hex_str(nibble_dict["last_three"])
-        elif nibble_dict["first"] == 0x2:
-            disasm_string = "CALL " + self.to_hex_str(nibble_dict["last_three"])
-        elif nibble_dict["first"] == 0x3:
-            reg_val = self.chip8.registers["v"][nibble_dict["second"]]
-            disasm_string = "SE V" + str(nibble_dict["second"]) + "(" + self.to_hex_str(reg_val) + ") == " + self.to_hex_str(nibble_dict["last_two"])
-        elif nibble_dict["first"] == 0x4:
-            reg_val = self.chip8.registers["v"][nibble_dict["second"]]
-            disasm_string = "SNE V" + str(nibble_dict["second"]) + "(" + self.to_hex_str(reg_val) + ") != " + self.to_hex_str(nibble_dict["last_two"])
-        elif nibble_dict["first"] == 0x5:
-            reg_val1 = self.chip8.registers["v"][nibble_dict["second"]]
-            reg_val2 = self.chip8.registers["v"][nibble_dict["third"]]
-            disasm_string = "SE V" + str(nibble_dict["second"]) + "(" + self.to_hex_str(reg_val1) + ") == V" + str(nibble_dict["third"]) + "(" + self.to_hex_str(reg_val2) + ")"
-        elif nibble_dict["first"] == 0x6:
-            disasm_string = "LD V" + str(nibble_dict["second"]) + " " + self.to_hex_str(nibble_dict["last_two"])
-        elif nibble_dict["first"] == 0x7:
-            reg_val = self.chip8.registers["v"][nibble_dict["second"]]
-            disasm_string = "ADD V" + str(nibble_dict["second"]) + "(" + self.to_hex_str(reg_val) + ") + " + self.to_hex_str(nibble_dict["last_two"])
-        elif nibble_dict["first"] == 0x8:
-            if nibble_dict["fourth"] == 0x0:
-                reg_val1 = self.chip8.registers["v"][nibble_dict["second"]]
-                reg_val2 = self.chip8.registers["v"][nibble_dict["third"]]
-                disasm_string = "LD V" + str(nibble_dict["second"]) + "(" + self.to_hex_str(reg_val1) + ") V" + str(nibble_dict["third"]) + "(" + self.to_hex_str(reg_val2) + ")"
-            elif nibble_dict["fourth"] == 0x1:
-                reg_val1 = self.chip8.registers["v"][nibble_dict["second"]]
-                reg_val2 = self.chip8.registers["v"][nibble_dict["third"]]
-                disasm_string = "OR V" + str(nibble_dict["second"]) + "(" + self.to_hex_str(reg_val1) + ") V" + str(nibble_dict["third"]) + "(" + self.to_hex_str(reg_val2) + ")"
-            elif nibble_dict["fourth"] == 0x2:
-                reg_val1 = self.chip8.registers["v"][nibble_dict["second"]]
-                reg_val2 = self.chip8.registers["v"][nibble_dict["third"]]
-                disasm_string = "AND V" + str(nibble_dict["second"]) + "(" + self.to_hex_str(reg_val1) + ") V" + str(nibble_dict["third"]) + "(" + self.to_hex_str(reg_val2) + ")"
-        
-        return disasm_string
-            
-    def to_hex_str(self, number):
+        :param opcode: 16 bit opcode
+        :return: The disassembly, empty if the opcode is not supported.
         """
-        Convert a number to a hex string.
         
-        :param number: The number to convert.
-        :return: The hex string.
+        disasm_string = self.static_disasm[opcode]
+        if disasm_string is not None:
+            return disasm_string
+        
+        return self.disassemble(opcode)
+
+    def disassemble(self, opcode):
         """
+        Build the disassembly of an opcode, including current register values.
         
-        return "0x%04X" % number
-            
+        :param opcode: 16 bit opcode
+        :return: The disassembly, empty if the opcode is not supported.
+        """
+        
+        handler = self.disasm_first_nibble_lookup[opcode >> 12]
+        if handler is None:
+            return ""
+        
+        return handler(
+            self,
+            (opcode & 0x0F00) >> 8,
+            (opcode & 0x00F0) >> 4,
+            opcode & 0x000F,
+            opcode & 0x00FF,
+            opcode & 0x0FFF,
+        )
+
+    def build_static_disasm_table(self):
+        """
+        Disassemble every opcode whose text does not depend on register values.
+        
+        :return: List indexed by opcode of disassembly strings, None where the
+                 disassembly has to be built when the opcode is printed.
+        """
+        
+        static_disasm = [None] * 0x10000
+        
+        # CLS/RET, JP, CALL and LD Vx, byte only show the opcode's own operands
+        for first in (0x0, 0x1, 0x2, 0x6):
+            for opcode in range(first << 12, (first + 1) << 12):
+                static_disasm[opcode] = self.disassemble(opcode)
+        
+        return static_disasm
+
+    def disasm_0x0(self, x, y, n, kk, nnn):
+        return self.disasm_0x0_last_byte_lookup.get(kk, "")
+
+    def disasm_jp(self, x, y, n, kk, nnn):
+        return f"JP 0x{nnn:04X}"
+
+    def disasm_call(self, x, y, n, kk, nnn):
+        return f"CALL 0x{nnn:04X}"
+
+    def disasm_se_byte(self, x, y, n, kk, nnn):
+        return f"SE V{x}(0x{self.chip8.V[x]:04X}) == 0x{kk:04X}"
+
+    def disasm_sne_byte(self, x, y, n, kk, nnn):
+        return f"SNE V{x}(0x{self.chip8.V[x]:04X}) != 0x{kk:04X}"
+
+    def disasm_se_reg(self, x, y, n, kk, nnn):
+        V = self.chip8.V
+        return f"SE V{x}(0x{V[x]:04X}) == V{y}(0x{V[y]:04X})"
+
+    def disasm_ld_byte(self, x, y, n, kk, nnn):
+        return f"LD V{x} 0x{kk:04X}"
+
+    def disasm_add_byte(self, x, y, n, kk, nnn):
+        return f"ADD V{x}(0x{self.chip8.V[x]:04X}) + 0x{kk:04X}"
+
+    def disasm_0x8(self, x, y, n, kk, nnn):
+        mnemonic = self.disasm_0x8_fourth_nibble_lookup[n]
+        if mnemonic is None:
+            return ""
+        
+        V = self.chip8.V
+        return f"{mnemonic} V{x}(0x{V[x]:04X}) V{y}(0x{V[y]:04X})"
 
     def should_halt(self):
         """
@@ -116,75 +173,78 @@ class Chip8Debugger:
         :return: True if the CPU should halt, False otherwise.
         """
         
-        return bool(self.is_addr_breakpoint(self.chip8.registers["pc"]) or self.halt)
+        # Skip the breakpoint lookup entirely when none are set
+        if not self.breakpoints:
+            return self.halt
+        
+        return self.halt or self.chip8.pc in self.breakpoints
 
-    def is_addr_breakpoint(self, address):
-        return bool(address in self.breakpoints)
-    
     def get_input(self):
         valid_input = False
         command_array = []
         
         while not valid_input:
-            command = input(">> ")
-            command = self.format_string(command)
+            command_array = self.split_command(input(">> "))
             
             # Use enter to reuse last command
-            if len(command) == 0 and self.last_input:
-                command_array = self.last_input
-                valid_input = True
-                return command_array
-            
-            command_array = command.split(" ")
+            if not command_array and self.last_input:
+                return self.last_input
             
-
-            
-            if command_array[0] in self.valid_commands:
+            if command_array and command_array[0] in self.commands:
                 valid_input = True
             
         return command_array
     
-    def format_string(self, string):
+    def split_command(self, string):
         """
-        Remove extra whitespace from a string.
+        Split a command into lowercase words, ignoring extra whitespace.
         
-        :param string: The string to remove whitespace from.
-        :return: The string without extra whitespace.
+        :param string: The command as typed.
+        :return: List of the words in the command, empty for a blank line.
         """
         
-        string = string.strip()
-        string = re.sub(r"\s+", " ", string)
-        string = string.lower()
-        
-        return string
+        # split() with no separator drops leading, trailing and repeated whitespace
+        return string.lower().split()
         
     def parse_input(self, command_array):
-        should_continue = True
-        
-        if command_array[0] == "b":
-            # Add breakpoint
-            self.add_breakpoint(int(command_array[1], 16) & 0xFFFF)
-            should_continue = False
-        elif command_array[0] == "d":
-            # Delete breakpoint
-            if command_array[1] in self.breakpoints:
-                self.breakpoints.remove(int(command_array[1], 16) & 0xFFFF)
-                
-            should_continue = False
-        elif command_array[0] in  ["s", "n"]:
-            # Step
-            self.halt = True
-        elif command_array[0] == "p":
-            should_continue = False
-            self.debug_print(command_array)
-        elif command_array[0] == "c":
-            # Continue running
-            pass
-        elif command_array[0] == "q":
-            # Quit
-            sys.exit(0)
-        
-        return should_continue
+        """
+        Run a debugger command.
+        
+        :param command_array: The command followed by its arguments.
+        :return: True if the emulator should resume, False to read another command.
+        """
+        
+        handler = self.commands.get(command_array[0])
+        if handler is None:
+            return True
+        
+        return handler(command_array)
+
+    def _cmd_break(self, command_array):
+        # Add breakpoint
+        self.add_breakpoint(int(command_array[1], 16) & 0xFFFF)
+        return False
+
+    def _cmd_delete(self, command_array):
+        # Delete breakpoint
+        self.breakpoints.discard(int(command_array[1], 16) & 0xFFFF)
+        return False
+
+    def _cmd_step(self, command_array):
+        # Stop again before the next instruction
+        self.halt = True
+        return True
+
+    def _cmd_print(self, command_array):
+        self.debug_print(command_array)
+        return False
+
+    def _cmd_continue(self, command_array):
+        # Continue running
+        return True
+
+    def _cmd_quit(self, command_array):
+        sys.exit(0)
 
     def add_breakpoint(self, address):
         """
@@ -195,35 +255,61 @@ class Chip8Debugger:
         :param address: The address to break at.
         """
         
-        if address not in self.breakpoints:
-            self.breakpoints.append(address)
+        self.breakpoints.add(address)
 
     def debug_print(self, command_array):
-        if command_array[1].startswith("0x"):
-            # Print memory address
-            opcode = self.get_mem_addr(int(command_array[1], 16) & 0xFFFF)
-            # Pretty print opcode in hex
-            print("0x%04X\t%04X" % (int(command_array[1], 16) & 0xFFFF, opcode))
-        elif command_array[1].startswith("v"):
-            # Print specified V register as hex
-            print("V%s\t%04X" % (command_array[1][1:], \
-                  self.chip8.registers["v"][int(command_array[1][1:], 16)]))
-            
-        elif command_array[1].startswith("i"):
-            # Print I register as hex
-            print("0x%04X" % self.chip8.registers["i"])
-        elif command_array[1].startswith("pc"):
-            # Print PC as hex
-            print("0x%04X" % self.chip8.registers["pc"])
-        elif command_array[1].startswith("sp"):
-            print("0x%04X" % self.chip8.registers["sp"])
-        elif command_array[1].startswith("stack"):
-            for i in range(len(self.chip8.stack)):
-                print("\tStack[%d]: %d" % (i, self.chip8.stack[i]))
-        elif command_array[1].startswith("b"):
-            # Print breakpoints in hex
-            for i in self.breakpoints:
-                print("0x%04X" % i)
+        """
+        Print memory, a register or the debugger state.
+        
+        Memory addresses (0x...) and V registers (v...) are matched by prefix,
+        every other target by name.
+        
+        :param command_array: The print command followed by what to print.
+        """
+        
+        target = command_array[1]
+        
+        if target.startswith("0x"):
+            self._print_memory(target)
+        elif target.startswith("v"):
+            self._print_v(target)
+        else:
+            handler = self.print_commands.get(target)
+            if handler is not None:
+                handler(target)
+
+    def _print_memory(self, target):
+        # Print memory address
+        address = int(target, 16) & 0xFFFF
+        opcode = self.get_mem_addr(address)
+        # Pretty print opcode in hex
+        print("0x%04X\t%04X" % (address, opcode))
+
+    def _print_v(self, target):
+        # Print specified V register as hex
+        print("V%s\t%04X" % (target[1:], self.chip8.V[int(target[1:], 16)]))
+
+    def _print_i(self, target):
+        # Print I register as hex
+        print("0x%04X" % self.chip8.I)
+
+    def _print_pc(self, target):
+        # Print PC as hex
+        print("0x%04X" % self.chip8.pc)
+
+    def _print_sp(self, target):
+        print("0x%04X" % self.chip8.sp)
+
+    def _print_stack(self, target):
+        # Build every line first so the stack is written with a single print
+        print("\n".join(
+            "\tStack[%d]: %d" % (i, value) for i, value in enumerate(self.chip8.stack)
+        ))
+
+    def _print_breakpoints(self, target):
+        # Print breakpoints in hex
+        if self.breakpoints:
+            print("\n".join("0x%04X" % i for i in sorted(self.breakpoints)))
         
     def get_mem_addr(self, address):
         """
@@ -233,5 +319,36 @@ class Chip8Debugger:
         :return: The opcode at the memory address
         """
     
-        opcode = self.chip8.memory[address] << 8 | self.chip8.memory[address + 1]
-        return opcode
+        return OPCODE_STRUCT.unpack_from(self.chip8.memory, address)[0]
+
+
+    ###########################
+    # DISASSEMBLY LOOKUP TABLES
+    ###########################
+    
+    # Indexed by the first nibble, None where disassembly is not supported
+    disasm_first_nibble_lookup = (
+        disasm_0x0,                     # 0x0
+        disasm_jp,                      # 0x1
+        disasm_call,                    # 0x2
+        disasm_se_byte,                 # 0x3
+        disasm_sne_byte,                # 0x4
+        disasm_se_reg,                  # 0x5
+        disasm_ld_byte,                 # 0x6
+        disasm_add_byte,                # 0x7
+        disasm_0x8,                     # 0x8
+        None, None, None, None, None, None, None,
+    )
+    
+    disasm_0x0_last_byte_lookup = {
+        0xE0: "CLS",
+        0xEE: "RET",
+    }
+    
+    # Mnemonics of the 0x8 register operations, indexed by the fourth nibble
+    disasm_0x8_fourth_nibble_lookup = (
+        "LD",                           # 0x0
+        "OR",                           # 0x1
+        "AND",                          # 0x2
+        None, None, None, None, None, None, None, None, None, None, None, None, None,
+    )
@@ -5,6 +5,16 @@ Class containing the display of the Chip8 emulator.
 import pygame
 
 class Chip8Display:
+    __slots__ = (
+        "BG_COLOR", "MAIN_COLOR", "width", "height", "scale", "size", "display",
+        "fb", "fb_surface", "scaled_surface",
+    )
+    
+    # Columns of the set bits in each sprite byte, most significant bit is column 0
+    BIT_COLUMNS = tuple(
+        tuple(i for i in range(8) if byte & (0x80 >> i)) for byte in range(256)
+    )
+    
     def __init__(self, width, height, scale=10):
         ###########################
         # CONSTANTS
@@ -19,8 +29,18 @@ class Chip8Display:
         self.width   = width
         self.height  = height
         self.scale   = scale
+        self.size    = (width * scale, height * scale)
         self.display = None
         
+        # Logical framebuffer, one byte per pixel, 1 if the pixel is lit
+        self.fb      = bytearray(width * height)
+        
+        # 8 bit surface sharing its pixels with the framebuffer, so the
+        # framebuffer can be presented without touching individual pixels
+        self.fb_surface = pygame.image.frombuffer(self.fb, (width, height), "P")
+        self.fb_surface.set_palette([self.BG_COLOR, self.MAIN_COLOR])
+        
+        self.scaled_surface = None
 
     def create_display(self):
         """
@@ -28,108 +48,67 @@ class Chip8Display:
         """
         
         if self.display is None:
-            self.display = pygame.display.set_mode(
-                (self.width * self.scale, self.height * self.scale)
-            )
+            self.display = pygame.display.set_mode(self.size)
+            
+            # Scaling target allocated once and reused every frame
+            self.scaled_surface = pygame.Surface(self.size, 0, self.fb_surface)
+            self.scaled_surface.set_palette(self.fb_surface.get_palette())
+            
             self.clear_display()
-            self.update_display()
    
     def clear_display(self):
         """
         Clears the display of the Chip8 emulator.
         """
         
-        self.display.fill(self.BG_COLOR)
-        self.update_display()
+        self.fb[:] = bytes(len(self.fb))
         
     def update_display(self):
         """
-        Updates the display of the Chip8 emulator.
+        Updates the display of the Chip8 emulator from the framebuffer.
+        Called once per frame, drawing functions do not update the display.
         """
         
+        pygame.transform.scale(self.fb_surface, self.size, self.scaled_surface)
+        self.display.blit(self.scaled_surface, (0, 0))
         pygame.display.update()
 
-    def draw_byte(self, x_pos, y_pos, byte):
+    def draw_sprite(self, x_pos, y_pos, sprite):
         """
         Opcode Dxyn - DRW Vx, Vy, nibble
         
         Draws a sprite at coordinate (Vx, Vy) with width 8 pixels and height n pixels.
+        Each sprite row is xored into the framebuffer, wrapping around the screen.
         
         :param x_pos: x-coordinate of the sprite to draw.
         :param y_pos: y-coordinate of the sprite to draw.
-        :param byte: The byte to draw.
-        
-        :return: True if pixel was overwritten, False otherwise.
-        """
-        overwritten = False
-        for i in range(8):
-            if self.is_bit_set(byte, i):
-                # Wrap pixel around the screen if it goes out of bounds
-                new_x_pos = (x_pos + i) % self.width
-                # Adjust y_pos if out of range values are passed
-                new_y_pos = (y_pos) % self.height
-                
-                draw_ret_val = self.draw_pixel(new_x_pos, new_y_pos)
-                
-                if draw_ret_val:
-                    overwritten = True
-        
-        return overwritten
-
-    def is_bit_set(self, byte, index):
-        """
-        Returns True if the bit at index is set in byte.
-        Where index is 0-7, and index 0 is the most significant bit.
+        :param sprite: The bytes of the sprite, one per row.
         
-        :param byte: The byte to check.
-        :param index: The index of the bit to check.
-        
-        :return: True if the bit is set, False otherwise.
+        :return: True if any pixel was overwritten, False otherwise.
         """
-        if index < 0 or index > 7:
-            raise ValueError("Index must be between 0 and 7")
         
-        return (byte & (1 << (7 - index))) != 0
-    
-    def draw_pixel(self, x_pos, y_pos):
-        """
-        Draws a pixel at coordinate (x_pos, y_pos).
+        fb = self.fb
+        width = self.width
+        height = self.height
+        bit_columns = self.BIT_COLUMNS
         
-        Xors with the pixel on the screen so that pixels already set are unset
-        if bit to be drawn is already set.
-
-        :param x_pos: x-coordinate of the pixel to draw.
-        :param y_pos: y-coordinate of the pixel to draw.
-        :return: True if pixel was overwritten, False otherwise.
-        """
+        # Wrapped x-coordinate of each sprite column, the same for every row
+        x_positions = [(x_pos + i) % width for i in range(8)]
         
-        overwrite = self.is_drawn_pixel_present(x_pos, y_pos)
-        
-        if not overwrite:
-            # Draw pixel
-            pygame.draw.rect(
-                self.display,
-                self.MAIN_COLOR,
-                (x_pos * self.scale, y_pos * self.scale, self.scale, self.scale),
-            )
-            self.update_display()
-        else:
-            # Clear pixel
-            pygame.draw.rect(
-                self.display,
-                self.BG_COLOR,
-                (x_pos * self.scale, y_pos * self.scale, self.scale, self.scale),
-            )
+        overwritten = False
+        for row, byte in enumerate(sprite):
+            # Empty rows leave the framebuffer untouched
+            if not byte:
+                continue
             
-        return overwrite
+            new_y_pos = (y_pos + row) % height
+            row_offset = new_y_pos * width
             
-    def is_drawn_pixel_present(self, x_pos, y_pos):
-        """
-        Returns True if the pixel at (x_pos, y_pos) is already drawn.
-        
-        :param x_pos: x-coordinate of the pixel to check.
-        :param y_pos: y-coordinate of the pixel to check.
-        """
+            for column in bit_columns[byte]:
+                index = row_offset + x_positions[column]
+                
+                if fb[index]:
+                    overwritten = True
+                fb[index] ^= 1
         
-        return self.display.get_at((x_pos * self.scale, y_pos * self.scale)) == self.MAIN_COLOR
-        
\ No newline at end of file
+        return overwritten
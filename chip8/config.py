@@ -1,3 +1,5 @@
+from struct import Struct
+
 import pygame
 
 STACK_SIZE = 16
@@ -7,13 +9,18 @@ START_ADDR = 0x200
 DISPLAY_WIDTH = 64
 DISPLAY_HEIGHT = 32
 
-# Time in milliseconds between each instruction
-CLOCK_SPEED = round((1 / 500) * 1000)
-# Time in milliseconds between each timer update
-TIMER_SPEED = round((1 / 60) * 1000)
+# Instructions executed per second
+CLOCK_SPEED_HZ = 500
+# Timer updates per second, the display is also refreshed at this rate
+TIMER_SPEED_HZ = 60
+# Length of a frame in nanoseconds, kept integral so frame pacing does not drift
+FRAME_PERIOD_NS = 1_000_000_000 // TIMER_SPEED_HZ
 
 FONT_ADDR_START = 0x0
 
+# Opcodes are stored big endian, two bytes each
+OPCODE_STRUCT = Struct(">H")
+
 FONT_SET = [
     0xF0, 0x90, 0x90, 0x90, 0xF0,  # 0
     0x20, 0x60, 0x20, 0x20, 0x70,  # 1
@@ -52,4 +59,7 @@ KEY_MAPPINGS = {
     0xF: pygame.K_v
 }
 
+# Reverse of KEY_MAPPINGS, pygame key to Chip8 key
+PYGAME_TO_CHIP8 = {value: key for key, value in KEY_MAPPINGS.items()}
+
 DEBUG = False
@@ -6,549 +6,392 @@ from unittest.mock import MagicMock, patch
 
 sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../")
 
-from chip8.Chip8CPU import Chip8CPU
+from chip8.Chip8CPU import Chip8CPU, InvalidLookup
+
+TEST_ROM_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "test_opcode.ch8")
+
+# Read once so tests that only need the rom contents do no file I/O
+with open(TEST_ROM_PATH, "rb") as f:
+    TEST_ROM = f.read()
+
+
+class FakeDisplay:
+    """
+    Minimal stand-in for Chip8Display that records what the CPU asks it to do
+    """
+    
+    __slots__ = ("calls", "cleared", "collision")
+    
+    def __init__(self, collision=False):
+        self.calls = []
+        self.cleared = False
+        self.collision = collision
+    
+    def clear_display(self):
+        self.cleared = True
+    
+    def draw_sprite(self, x_pos, y_pos, sprite):
+        self.calls.append((x_pos, y_pos, bytes(sprite)))
+        return self.collision
+    
+    def update_display(self):
+        pass
 
 class TestChip8CPU(unittest.TestCase):
     def __init__(self, *args, **kwargs):
         super(TestChip8CPU, self).__init__(*args, **kwargs)
 
+    @classmethod
+    def setUpClass(cls):
+        # One CPU for the whole class, reset to its power-on state before each test
+        cls.cpu = Chip8CPU()
+
     def setUp(self):
-        self.chip8 = Chip8CPU()
+        self.chip8 = self.cpu
+        self.chip8.reset()
+        
+        self.chip8.display = None
+        self.chip8.keys_pressed = None
 
-    def test_load_rom(self):
+    def operands(self, opcode):
         """
-        Test first and last byte of ROM
+        Decode an opcode and return its (x, y, n, kk, nnn) operands
         """
-        self.chip8.load_rom("tests/test_opcode.ch8")
-
-        # First byte of file
-        self.assertEqual(self.chip8.memory[0x200], 0x12)
-
-        # Last byte of file
-        self.assertEqual(self.chip8.memory[0x200 + 0x01DD], 0xDC)
-
+        
+        return self.chip8.decode_opcode(opcode)[1:]
 
-    def test_clear_screen(self):
+    def test_load_rom(self):
         """
-        Test Opcode 0x00E0 - CLS
-        
-        Clear the screen.
+        Test loading the ROM file copies all of it to the start address
         """
+        self.chip8.load_rom(TEST_ROM_PATH)
 
-        self.chip8.display = MagicMock()
-        
-        self.chip8.clear_screen()
-        
-        self.chip8.display.clear_display.assert_called_with()
-        self.chip8.display.update_display.assert_called_with()
+        self.assertEqual(self.chip8.memory[0x200 : 0x200 + len(TEST_ROM)], TEST_ROM)
 
-    def test_return_from_subrtn(self):
+    def test_load_rom_bytes(self):
         """
-        Test Opcode 00EE - RET
-        
-        Return from a subroutine by popping the stack and setting the program counter to the popped value.
+        Test first and last byte of ROM
         """
+        self.chip8.load_rom_bytes(TEST_ROM)
 
-        self.chip8.registers["pc"] = 0x240
-        self.chip8.stack[0x1] = 0x220
-        self.chip8.registers["sp"] = 0x1
-        
-        self.chip8.return_from_subrtn()
-        
-        self.assertEqual(self.chip8.registers["pc"], 0x220)
+        # First byte of file
+        self.assertEqual(self.chip8.memory[0x200], 0x12)
 
+        # Last byte of file
+        self.assertEqual(self.chip8.memory[0x200 + 0x01DD], 0xDC)
+        self.assertEqual(self.chip8.memory[0x200 + 0x01DE], 0x00)
 
-    def test_jump_addr(self):
+    def test_load_fontset(self):
         """
-        Test Opcode 1nnn - JP addr
-        
-        Jump to address nnn.
+        Test the fontset is loaded into memory on creation
         """
-        
-        nibble_dict = {
-            "last_three": 0x0300   
-        }
-        
-        self.chip8.registers["pc"] = 0x230
 
-        self.chip8.jump_addr(nibble_dict)
+        self.assertEqual(list(self.chip8.memory[0x00:0x50]), self.chip8.FONT_SET)
 
-        self.assertEqual(self.chip8.registers["pc"],  (0x0300 - 0x2))
 
-    def test_call_addr(self):
+    def test_reset(self):
         """
-        Test Opcode 2nnn - CALL addr
-        
-        Call subroutine at nnn. Push current pc onto stack and jump to nnn.
+        Test reset restores memory, registers and the stack
         """
 
-        nibble_dict = {
-            "last_three": 0x0350   
-        }
-        
-        self.chip8.registers["pc"] = 0x240
-        self.chip8.registers["sp"] = 0x4
-        
-        self.assertEqual(self.chip8.registers["sp"], 0x4)
-        
-        self.chip8.call_addr(nibble_dict)
+        self.chip8.load_memory(0x200, [0x6A, 0x42])
+        self.chip8.emulate_cyle()
+        self.chip8.I = 0x300
+        self.chip8.sp = 0x1
+        self.chip8.stack[0x1] = 0x222
+        self.chip8.dt = 0x10
 
-        self.assertEqual(self.chip8.registers["pc"],  (0x0350 - 0x2))
-        self.assertEqual(self.chip8.stack[0x5], 0x240)
-        self.assertEqual(self.chip8.registers["sp"], 0x5)
+        self.chip8.reset()
 
+        self.assertEqual(self.chip8.memory[0x200:0x202], bytearray(2))
+        self.assertIsNone(self.chip8.decoded[0x200])
+        self.assertEqual(self.chip8.V, bytearray(16))
+        self.assertEqual((self.chip8.I, self.chip8.sp, self.chip8.pc), (0x0, 0x0, 0x200))
+        self.assertEqual(list(self.chip8.stack), [0] * 16)
+        self.assertEqual(self.chip8.dt, 0x0)
+        self.assertEqual(list(self.chip8.memory[0x00:0x50]), self.chip8.FONT_SET)
 
-    def test_skip_reg_eq_byte_neq(self):
+    def test_decode_opcode(self):
         """
-        Test Opcode 3xkk - SE Vx, byte
-        Test when not equal
-        
-        Skip next instruction if Vx = kk.
+        Test decoding an opcode into its handler and operands
         """
-
-        nibble_dict = {
-            "second": 0x1,
-            "last_two": 0x23,
-        }
-        
-        self.chip8.registers["pc"] = 0x330
-        
-        self.chip8.registers["v"][0x1] = 0x10
         
-        self.chip8.skip_reg_eq_byte(nibble_dict)
-        
-        self.assertEqual(self.chip8.registers["pc"], 0x330)
+        handler, x, y, n, kk, nnn = self.chip8.decode_opcode(0x8AB4)
         
+        self.assertEqual(handler, Chip8CPU.add_regs)
+        self.assertEqual((x, y, n, kk, nnn), (0xA, 0xB, 0x4, 0xB4, 0xAB4))
 
-    def test_skip_reg_eq_byte_eq(self):
+    def test_decode_invalid_opcode(self):
         """
-        Test Opcode 3xkk - SE Vx, byte
-        Test when equal
-        
-        Skip next instruction if Vx = kk.
-        """
-
-        nibble_dict = {
-            "second": 0x2,
-            "last_two": 0x12,
-        }
-        
-        self.chip8.registers["pc"] = 0x430
-        
-        self.chip8.registers["v"][0x2] = 0x12
-        
-        self.chip8.skip_reg_eq_byte(nibble_dict)
-        
-        self.assertEqual(self.chip8.registers["pc"], 0x432)
-
-    def test_skip_reg_neq_byte_neq(self):
-        """
-        Test Opcode 4xkk - SNE Vx, byte
-        Test when not equal
-        
-        Skip next instruction if Vx != kk.
+        Test decoding an opcode that has no handler
         """
-
-        nibble_dict = {
-            "second": 0x4,
-            "last_two": 0x10,
-        }
         
-        self.chip8.registers["pc"] = 0x510
-        
-        self.chip8.registers["v"][0x4] = 0x22
-        
-        self.chip8.skip_reg_neq_byte(nibble_dict)
-        
-        self.assertEqual(self.chip8.registers["pc"], 0x512)
+        with self.assertRaises(InvalidLookup):
+            self.chip8.decode_opcode(0x8AB8)
 
-    def test_skip_reg_neq_byte_eq(self):
+    def test_emulate_cycle_caches_decoded_opcode(self):
         """
-        Test Opcode 4xkk - SNE Vx, byte
-        Test when equal
-        
-        Skip next instruction if Vx != kk.
+        Test that an executed opcode is cached by address
         """
-
-        nibble_dict = {
-            "second": 0x8,
-            "last_two": 0x50,
-        }
-        
-        self.chip8.registers["pc"] = 0x600
         
-        self.chip8.registers["v"][0x8] = 0x50
+        self.chip8.load_memory(0x200, [0x6A, 0x42])
         
-        self.chip8.skip_reg_neq_byte(nibble_dict)
+        self.chip8.emulate_cyle()
         
-        self.assertEqual(self.chip8.registers["pc"], 0x600)
+        self.assertEqual(self.chip8.V[0xA], 0x42)
+        self.assertEqual(self.chip8.decoded[0x200][0], Chip8CPU.ld_to_reg)
 
-    def test_skip_reg_eq_reg_neq(self):
+    def test_memory_write_invalidates_decoded_opcode(self):
         """
-        Test Opcode 5xy0 - SE Vx, Vy
-        Test when not equal
-        
-        Skip next instruction if Vx = Vy.
+        Test that writing over a cached opcode causes it to be decoded again
         """
         
-        nibble_dict = {
-            "second": 0x4,
-            "third": 0x0,
-        }
+        self.chip8.load_memory(0x200, [0x6A, 0x42])
+        self.chip8.emulate_cyle()
         
-        self.chip8.registers["pc"] = 0x440
+        # Fx55 overwrites the second byte of the cached opcode
+        self.chip8.I = 0x201
+        self.chip8.V[0x0] = 0x17
+        self.chip8.store_regs_at_i(*self.operands(0xF055))
         
-        self.chip8.registers["v"][0x4] = 0x22
-        self.chip8.registers["v"][0x0] = 0x10
+        self.assertIsNone(self.chip8.decoded[0x200])
         
-        self.chip8.skip_reg_eq_reg(nibble_dict)
+        self.chip8.pc = 0x200
+        self.chip8.emulate_cyle()
         
-        self.assertEqual(self.chip8.registers["pc"], 0x440)
+        self.assertEqual(self.chip8.V[0xA], 0x17)
 
-    def test_skip_reg_eq_reg_eq(self):
+    def test_emulate_cycles(self):
         """
-        Test Opcode 5xy0 - SE Vx, Vy
-        Test when equal
-        
-        Skip next instruction if Vx = Vy.
+        Test running a subroutine call and return in a single batch
         """
-
-        nibble_dict = {
-            "second": 0xE,
-            "third": 0xF,
-        }
-        
-        self.chip8.registers["pc"] = 0xFA0
         
-        self.chip8.registers["v"][0xE] = 0xAA
-        self.chip8.registers["v"][0xF] = 0xAA
+        self.chip8.load_memory(0x200, [0x22, 0x04, 0x12, 0x02, 0x6A, 0x42, 0x00, 0xEE])
         
-        self.chip8.skip_reg_eq_reg(nibble_dict)
+        self.chip8.emulate_cycles(3)
         
-        self.assertEqual(self.chip8.registers["pc"], 0xFA2)
+        self.assertEqual(
+            {"VA": self.chip8.V[0xA], "pc": self.chip8.pc, "sp": self.chip8.sp},
+            {"VA": 0x42, "pc": 0x202, "sp": 0x0}
+        )
 
-    def test_ld_to_reg(self):
+    def test_clear_screen(self):
         """
-        Test Opcode 6xkk - LD Vx, byte
+        Test Opcode 0x00E0 - CLS
         
-        Load byte into Vx.
+        Clear the screen.
         """
 
-        nibble_dict = {
-            "second": 0xB,
-            "last_two": 0xBB,
-        }
-        
-        self.chip8.registers["v"][0xB] = 0x0
+        self.chip8.display = FakeDisplay()
         
-        self.chip8.ld_to_reg(nibble_dict)
+        self.chip8.clear_screen(*self.operands(0x00E0))
         
-        self.assertEqual(self.chip8.registers["v"][0xB], 0xBB)
+        self.assertTrue(self.chip8.display.cleared)
 
-    def test_add_byte_to_reg(self):
+    def test_return_from_subrtn(self):
         """
-        Test Opcode 7xkk - ADD Vx, byte
+        Test Opcode 00EE - RET
         
-        Add byte to Vx.
+        Return from a subroutine by popping the stack and setting the program counter to the popped value.
         """
 
-        nibble_dict = {
-            "second": 0xC,
-            "last_two": 0xDA,
-        }
-        
-        self.chip8.registers["v"][0xC] = 0x01
-
-        self.chip8.add_byte_to_reg(nibble_dict)
-        
-        self.assertEqual(self.chip8.registers["v"][0xC], 0xDB)
-    
-    def test_add_byte_to_reg_overflow(self):
-        """
-        Test Opcode 7xkk - ADD Vx, byte
-        Test when addition goes over 255
+        self.chip8.pc = 0x240
+        self.chip8.stack[0x1] = 0x220
+        self.chip8.sp = 0x1
         
-        Add byte to Vx.
-        """
-
-        nibble_dict = {
-            "second": 0xD,
-            "last_two": 0xFF,
-        }
+        self.chip8.return_from_subrtn(*self.operands(0x00EE))
         
-        self.chip8.registers["v"][0xD] = 0x0A
+        self.assertEqual(self.chip8.pc, 0x220)
 
-        self.chip8.add_byte_to_reg(nibble_dict)
-        
-        self.assertEqual(self.chip8.registers["v"][0xD], 0x09)
 
-    def test_ld_reg_to_reg(self):
+    def test_jump_addr(self):
         """
-        Test Opcode 8xy0 - LD Vx, Vy
+        Test Opcode 1nnn - JP addr
         
-        Load Vy into Vx.
+        Jump to address nnn.
         """
-
-        nibble_dict = {
-            "second": 0x1,
-            "third": 0x2,
-        }
-        
-        self.chip8.registers["v"][0x1] = 0x00
-        self.chip8.registers["v"][0x2] = 0x11
-        
-        self.chip8.ld_reg_to_reg(nibble_dict)
         
-        self.assertEqual(self.chip8.registers["v"][0x1], 0x11)
+        self.chip8.pc = 0x230
 
+        self.chip8.jump_addr(*self.operands(0x1300))
 
-    def test_or_regs(self):
-        """
-        Test Opcode 8xy1 - OR Vx, Vy
-        
-        Or Vx and Vy. Set Vx to result.
-        """
-
-        nibble_dict = {
-            "second": 0x2,
-            "third": 0x3,
-        }
-        
-        self.chip8.registers["v"][0x2] = 0x0F
-        self.chip8.registers["v"][0x3] = 0xF0
-        
-        self.chip8.or_regs(nibble_dict)
-        
-        self.assertEqual(self.chip8.registers["v"][0x2], 0xFF)
+        self.assertEqual(self.chip8.pc, 0x0300)
 
-    def test_and_regs(self):
+    def test_call_addr(self):
         """
-        Test Opcode 8xy2 - AND Vx, Vy
+        Test Opcode 2nnn - CALL addr
         
-        And Vx and Vy. Set Vx to result.
+        Call subroutine at nnn. Push the return address onto stack and jump to nnn.
         """
 
-        nibble_dict = {
-            "second": 0xD,
-            "third": 0xE,
-        }
+        self.chip8.pc = 0x240
+        self.chip8.sp = 0x4
         
-        self.chip8.registers["v"][0xD] = 0x0A
-        self.chip8.registers["v"][0xE] = 0x0D
+        self.assertEqual(self.chip8.sp, 0x4)
         
-        self.chip8.and_regs(nibble_dict)
-        
-        self.assertEqual(self.chip8.registers["v"][0xD], 0x08)
+        self.chip8.call_addr(*self.operands(0x2350))
 
-    def test_xor_regs(self):
-        """
-        Test Opcode 8xy3 - XOR Vx, Vy
-        
-        Xor Vx and Vy. Set Vx to result.
-        """
+        self.assertEqual(
+            {"pc": self.chip8.pc, "stack[5]": self.chip8.stack[0x5], "sp": self.chip8.sp},
+            {"pc": 0x0350, "stack[5]": 0x240, "sp": 0x5}
+        )
 
-        nibble_dict = {
-            "second": 0x4,
-            "third": 0x5,
-        }
-        
-        self.chip8.registers["v"][0x4] = 0x0F
-        self.chip8.registers["v"][0x5] = 0xAB
-        
-        self.chip8.xor_regs(nibble_dict)
-        
-        self.assertEqual(self.chip8.registers["v"][0x4], 0xA4)
 
-    def test_add_regs_no_carry(self):
+    def test_skip_reg_eq_byte_neq(self):
         """
-        Test Opcode 8xy4 - ADD Vx, Vy
-        Test without carry
+        Test Opcode 3xkk - SE Vx, byte
+        Test when not equal
         
-        Add Vx and Vy. Set Vx to result.
-        Set VF to 1 if there is a carry, 0 otherwise.
+        Skip next instruction if Vx = kk.
         """
 
-        nibble_dict = {
-            "second": 0x6,
-            "third": 0x7,
-        }
-        
-        self.chip8.registers["v"][0x6] = 0x0F
-        self.chip8.registers["v"][0x7] = 0xAB
-        
-        self.chip8.add_regs(nibble_dict)
-        
-        self.assertEqual(self.chip8.registers["v"][0x6], 0xBA)
-        self.assertEqual(self.chip8.registers["v"][0xF], 0x0)
-
-    def test_add_regs_carry(self):
-        """
-        Test Opcode 8xy4 - ADD Vx, Vy
-        Test with carry
+        self.chip8.pc = 0x330
         
-        Add Vx and Vy. Set Vx to result.
-        Set VF to 1 if there is a carry, 0 otherwise.
-        """
-
-        nibble_dict = {
-            "second": 0x8,
-            "third": 0x9,
-        }
+        self.chip8.V[0x1] = 0x10
         
-        self.chip8.registers["v"][0x8] = 0xFF
-        self.chip8.registers["v"][0x9] = 0x0B
+        self.chip8.skip_reg_eq_byte(*self.operands(0x3123))
         
-        self.chip8.add_regs(nibble_dict)
+        self.assertEqual(self.chip8.pc, 0x330)
         
-        self.assertEqual(self.chip8.registers["v"][0x8], 0x0A)
-        self.assertEqual(self.chip8.registers["v"][0xF], 0x1)
 
-    def test_sub_regs_no_borrow(self):
+    def test_skip_reg_eq_byte_eq(self):
         """
-        Test Opcode 8xy5 - SUB Vx, Vy
-        Test without borrow
+        Test Opcode 3xkk - SE Vx, byte
+        Test when equal
         
-        Subtract Vx from Vy. Set Vx to result.
-        Set VF to 1 if there is no borrow, 0 otherwise.
+        Skip next instruction if Vx = kk.
         """
 
-        nibble_dict = {
-            "second": 0xA,
-            "third": 0xB,
-        }
+        self.chip8.pc = 0x430
         
-        self.chip8.registers["v"][0xA] = 0xAC
-        self.chip8.registers["v"][0xB] = 0x0C
+        self.chip8.V[0x2] = 0x12
         
-        self.chip8.sub_regs(nibble_dict)
+        self.chip8.skip_reg_eq_byte(*self.operands(0x3212))
         
-        self.assertEqual(self.chip8.registers["v"][0xA], 0xA0)
-        self.assertEqual(self.chip8.registers["v"][0xF], 0x1)
+        self.assertEqual(self.chip8.pc, 0x432)
 
-    def test_sub_regs_borrow(self):
+    def test_skip_reg_neq_byte_neq(self):
         """
-        Test Opcode 8xy5 - SUB Vx, Vy
-        Test with borrow
+        Test Opcode 4xkk - SNE Vx, byte
+        Test when not equal
         
-        Subtract Vx from Vy. Set Vx to result.
-        Set VF to 1 if there is no borrow, 0 otherwise.
+        Skip next instruction if Vx != kk.
         """
 
-        nibble_dict = {
-            "second": 0xC,
-            "third": 0xD,
-        }
+        self.chip8.pc = 0x510
         
-        self.chip8.registers["v"][0xC] = 0x0A
-        self.chip8.registers["v"][0xD] = 0xDD
+        self.chip8.V[0x4] = 0x22
         
-        self.chip8.sub_regs(nibble_dict)
+        self.chip8.skip_reg_neq_byte(*self.operands(0x4410))
         
-        self.assertEqual(self.chip8.registers["v"][0xC], 0x2D)
-        self.assertEqual(self.chip8.registers["v"][0xF], 0x0)
+        self.assertEqual(self.chip8.pc, 0x512)
 
-    def test_right_shift_reg(self):
+    def test_skip_reg_neq_byte_eq(self):
         """
-        Test Opcode 8xy6 - SHR Vx {, Vy}
+        Test Opcode 4xkk - SNE Vx, byte
+        Test when equal
         
-        Right shift Vx. Set Vx to result.
+        Skip next instruction if Vx != kk.
         """
 
-        nibble_dict = {
-            "second": 0xE,
-            "third": 0xF,
-        }
+        self.chip8.pc = 0x600
         
-        self.chip8.registers["v"][0xE] = 0x0F
+        self.chip8.V[0x8] = 0x50
         
-        self.chip8.right_shift_reg(nibble_dict)
+        self.chip8.skip_reg_neq_byte(*self.operands(0x4850))
         
-        self.assertEqual(self.chip8.registers["v"][0xE], 0x07)
+        self.assertEqual(self.chip8.pc, 0x600)
 
-    def test_reverse_sub_regs_no_borrow(self):
-        """
-        Test Opcode 8xy7 - SUBN Vx, Vy
-        Test without borrow
-        
-        Subtract Vy from Vx. Set Vx to result.
-        Set VF to 1 if there is no borrow, 0 otherwise.
+    def test_skip_reg_eq_reg_neq(self):
         """
-
-
-        nibble_dict = {
-            "second": 0xA,
-            "third": 0xE,
-        }
-        
-        self.chip8.registers["v"][0xA] = 0xCA
-        self.chip8.registers["v"][0xE] = 0xFA
-        
-        self.chip8.reverse_sub_regs(nibble_dict)
+        Test Opcode 5xy0 - SE Vx, Vy
+        Test when not equal
         
-        self.assertEqual(self.chip8.registers["v"][0xA], 0x30)
-        self.assertEqual(self.chip8.registers["v"][0xF], 0x1)
-
-    def test_reverse_sub_regs_borrow(self):
+        Skip next instruction if Vx = Vy.
         """
-        Test Opcode 8xy7 - SUBN Vx, Vy
-        Test with borrow
         
-        Subtract Vy from Vx. Set Vx to result.
-        Set VF to 1 if there is no borrow, 0 otherwise.
-        """
-
-        nibble_dict = {
-            "second": 0xB,
-            "third": 0xF,
-        }
+        self.chip8.pc = 0x440
         
-        self.chip8.registers["v"][0xB] = 0xF0
-        self.chip8.registers["v"][0xF] = 0x08
+        self.chip8.V[0x4] = 0x22
+        self.chip8.V[0x0] = 0x10
         
-        self.chip8.reverse_sub_regs(nibble_dict)
+        self.chip8.skip_reg_eq_reg(*self.operands(0x5400))
         
-        self.assertEqual(self.chip8.registers["v"][0xB], 0x18)
-        self.assertEqual(self.chip8.registers["v"][0xF], 0x0)
+        self.assertEqual(self.chip8.pc, 0x440)
 
-    def test_left_shift_reg_no_carry(self):
+    def test_skip_reg_eq_reg_eq(self):
         """
-        Test Opcode 8xyE - SHL Vx {, Vy}
-        Test with no carry
+        Test Opcode 5xy0 - SE Vx, Vy
+        Test when equal
         
-        Shift Vx left. Set Vx to result.
-        Set VF to 1 if most significant bit is set, 0 otherwise.
+        Skip next instruction if Vx = Vy.
         """
-            
-        nibble_dict = {
-            "second": 0xE,
-        }
-            
-        self.chip8.registers["v"][0xE] = 0x0A
-        
-        self.chip8.left_shift_reg(nibble_dict)
-        
-        self.assertEqual(self.chip8.registers["v"][0xE], 0x14)
-        self.assertEqual(self.chip8.registers["v"][0xF], 0x0)
 
-    def test_left_shift_reg_carry(self):
-        """
-        Test Opcode 8xyE - SHL Vx {, Vy}
-        Test with carry
-        
-        Shift Vx left. Set Vx to result.
-        Set VF to 1 if most significant bit is set, 0 otherwise.
-        """
-            
-        nibble_dict = {
-            "second": 0x3,
-        }
-            
-        self.chip8.registers["v"][0x3] = 0xF0
-        
-        self.chip8.left_shift_reg(nibble_dict)
-        
-        self.assertEqual(self.chip8.registers["v"][0x3], 0xE0)
-        self.assertEqual(self.chip8.registers["v"][0xF], 0x1)
+        self.chip8.pc = 0xFA0
+        
+        self.chip8.V[0xE] = 0xAA
+        self.chip8.V[0xF] = 0xAA
+        
+        self.chip8.skip_reg_eq_reg(*self.operands(0x5EF0))
+        
+        self.assertEqual(self.chip8.pc, 0xFA2)
+
+    # Opcode 6xkk, 7xkk and 8xyn register operations
+    # (opcode, handler, registers before, registers expected after)
+    REGISTER_OPERATION_CASES = (
+        # 6xkk - LD Vx, byte
+        (0x6BBB, Chip8CPU.ld_to_reg, {0xB: 0x00}, {0xB: 0xBB}),
+        # 7xkk - ADD Vx, byte, wrapping past 255 without touching VF
+        (0x7CDA, Chip8CPU.add_byte_to_reg, {0xC: 0x01}, {0xC: 0xDB}),
+        (0x7DFF, Chip8CPU.add_byte_to_reg, {0xD: 0x0A}, {0xD: 0x09, 0xF: 0x0}),
+        # 8xy0 - LD Vx, Vy
+        (0x8120, Chip8CPU.ld_reg_to_reg, {0x1: 0x00, 0x2: 0x11}, {0x1: 0x11}),
+        # 8xy1 - OR Vx, Vy
+        (0x8231, Chip8CPU.or_regs, {0x2: 0x0F, 0x3: 0xF0}, {0x2: 0xFF}),
+        # 8xy2 - AND Vx, Vy
+        (0x8DE2, Chip8CPU.and_regs, {0xD: 0x0A, 0xE: 0x0D}, {0xD: 0x08}),
+        # 8xy3 - XOR Vx, Vy
+        (0x8453, Chip8CPU.xor_regs, {0x4: 0x0F, 0x5: 0xAB}, {0x4: 0xA4}),
+        # 8xy4 - ADD Vx, Vy, VF set on carry
+        (0x8674, Chip8CPU.add_regs, {0x6: 0x0F, 0x7: 0xAB}, {0x6: 0xBA, 0xF: 0x0}),
+        (0x8894, Chip8CPU.add_regs, {0x8: 0xFF, 0x9: 0x0B}, {0x8: 0x0A, 0xF: 0x1}),
+        # 8xy5 - SUB Vx, Vy, VF set when there is no borrow
+        (0x8AB5, Chip8CPU.sub_regs, {0xA: 0xAC, 0xB: 0x0C}, {0xA: 0xA0, 0xF: 0x1}),
+        (0x8CD5, Chip8CPU.sub_regs, {0xC: 0x0A, 0xD: 0xDD}, {0xC: 0x2D, 0xF: 0x0}),
+        # 8xy6 - SHR Vx {, Vy}
+        (0x8EF6, Chip8CPU.right_shift_reg, {0xE: 0x0F}, {0xE: 0x07}),
+        # 8xy7 - SUBN Vx, Vy, VF set when there is no borrow
+        (0x8AE7, Chip8CPU.reverse_sub_regs, {0xA: 0xCA, 0xE: 0xFA}, {0xA: 0x30, 0xF: 0x1}),
+        (0x8BF7, Chip8CPU.reverse_sub_regs, {0xB: 0xF0, 0xF: 0x08}, {0xB: 0x18, 0xF: 0x0}),
+        # 8xyE - SHL Vx {, Vy}, VF set to the most significant bit
+        (0x8E0E, Chip8CPU.left_shift_reg, {0xE: 0x0A}, {0xE: 0x14, 0xF: 0x0}),
+        (0x830E, Chip8CPU.left_shift_reg, {0x3: 0xF0}, {0x3: 0xE0, 0xF: 0x1}),
+    )
+
+    def test_register_operations(self):
+        """
+        Test Opcodes 6xkk, 7xkk and 8xy0 to 8xyE - register operations
+        
+        Each case sets the registers, runs the opcode and checks the
+        registers it should have changed.
+        """
+        
+        chip8 = self.chip8
+        
+        # reset() clears V in place, so the same bytearray is used by every case
+        V = chip8.V
+        
+        for opcode, handler, before, after in self.REGISTER_OPERATION_CASES:
+            with self.subTest(opcode="0x%04X" % opcode):
+                chip8.reset()
+                
+                for register, value in before.items():
+                    V[register] = value
+                
+                handler(chip8, *self.operands(opcode))
+                
+                # One comparison per case, a failure shows every mismatched register
+                self.assertEqual({register: V[register] for register in after}, after)
         
     def test_reg_neq_reg_eq(self):
         """
@@ -558,17 +401,12 @@ class TestChip8CPU(unittest.TestCase):
         Skip next instruction if Vx != Vy.
         """
         
-        nibble_dict = {
-            "second": 0xA,
-            "third": 0xB,
-        }
+        self.chip8.V[0xA] = 0x0A
+        self.chip8.V[0xB] = 0x0A
         
-        self.chip8.registers["v"][0xA] = 0x0A
-        self.chip8.registers["v"][0xB] = 0x0A
+        self.chip8.skip_reg_neq_reg(*self.operands(0x9AB0))
         
-        self.chip8.skip_reg_neq_reg(nibble_dict)
-        
-        self.assertEqual(self.chip8.registers["pc"], 0x200)
+        self.assertEqual(self.chip8.pc, 0x200)
         
     def test_reg_neq_reg_neq(self):
         """
@@ -578,17 +416,12 @@ class TestChip8CPU(unittest.TestCase):
         Skip next instruction if Vx != Vy.
         """
         
-        nibble_dict = {
-            "second": 0xC,
-            "third": 0x7,
-        }
-        
-        self.chip8.registers["v"][0xC] = 0x10
-        self.chip8.registers["v"][0x7] = 0x22
+        self.chip8.V[0xC] = 0x10
+        self.chip8.V[0x7] = 0x22
         
-        self.chip8.skip_reg_neq_reg(nibble_dict)
+        self.chip8.skip_reg_neq_reg(*self.operands(0x9C70))
         
-        self.assertEqual(self.chip8.registers["pc"], 0x202)
+        self.assertEqual(self.chip8.pc, 0x202)
         
     def test_ld_i(self):
         """
@@ -597,15 +430,11 @@ class TestChip8CPU(unittest.TestCase):
         Load I with nnn
         """
         
-        nibble_dict = {
-            "last_three": 0x400
-        }
+        self.chip8.I = 0x0
         
-        self.chip8.registers["i"] = 0x0
+        self.chip8.ld_i(*self.operands(0xA400))
         
-        self.chip8.ld_i(nibble_dict)
-        
-        self.assertEqual(self.chip8.registers["i"], 0x400)
+        self.assertEqual(self.chip8.I, 0x400)
         
 
     def test_jmp_reg0_with_byte(self):
@@ -615,36 +444,26 @@ class TestChip8CPU(unittest.TestCase):
         Jump to location nnn + V0.
         """
         
-        nibble_dict = {
-            "last_three": 0xB00
-        }
-        
-        self.chip8.registers["v"][0x0] = 0xF
+        self.chip8.V[0x0] = 0xF
         
-        self.chip8.jmp_reg0_with_byte(nibble_dict)
+        self.chip8.jmp_reg0_with_byte(*self.operands(0xBB00))
         
-        self.assertEqual(self.chip8.registers["pc"], 0xB0D)
+        self.assertEqual(self.chip8.pc, 0xB0F)
         
-    @patch("random.randint")  
-    def test_store_rnd_anded_byte_to_reg(self, mock_randint):
+    def test_store_rnd_anded_byte_to_reg(self):
         """
         Opcode Cxkk - RND Vx, byte
         
         Set Vx to random byte ANDed with kk.
         """
         
-        mock_randint.return_value = 0xCD
+        self.chip8.V[0xC] = 0x0
         
-        nibble_dict = {
-            "second": 0xC,
-            "last_two": 0x07
-        }
+        with patch.object(self.chip8._rng, "getrandbits", return_value=0xCD) as mock_getrandbits:
+            self.chip8.store_rnd_anded_byte_to_reg(*self.operands(0xCC07))
         
-        self.chip8.registers["v"][0xC] = 0x0
-        
-        self.chip8.store_rnd_anded_byte_to_reg(nibble_dict)
-        
-        self.assertEqual(self.chip8.registers["v"][0xC], 0x05)
+        mock_getrandbits.assert_called_with(8)
+        self.assertEqual(self.chip8.V[0xC], 0x05)
 
     def test_draw_bytes_no_collision(self):
         """
@@ -654,33 +473,20 @@ class TestChip8CPU(unittest.TestCase):
         Draws a sprite at coordinate (Vx, Vy) with width 8 pixels and height n pixels.
         """
         
-        self.chip8.display = MagicMock()
-        self.chip8.display.draw_byte.return_value = False
+        self.chip8.display = FakeDisplay(collision=False)
         
-        nibble_dict = {
-            "second": 0xD,
-            "third": 0x0,
-            "fourth": 0x3
-        }
+        self.chip8.V[0xD] = 0x01
+        self.chip8.V[0x0] = 0x03
         
-        self.chip8.registers["v"][0xD] = 0x01
-        self.chip8.registers["v"][0x0] = 0x03
+        self.chip8.I = 0x50
         
-        self.chip8.registers["i"] = 0x50
+        self.chip8.load_memory(self.chip8.I, b"\xF0\xBB\xA7")
         
-        self.chip8.memory[self.chip8.registers["i"]]     = 0xF0
-        self.chip8.memory[self.chip8.registers["i"] + 1] = 0xBB
-        self.chip8.memory[self.chip8.registers["i"] + 2] = 0xA7
+        self.chip8.draw_bytes(*self.operands(0xDD03))
         
-        self.chip8.draw_bytes(nibble_dict)
+        self.assertEqual(self.chip8.display.calls, [(0x01, 0x03, bytes([0xF0, 0xBB, 0xA7]))])
         
-        self.chip8.display.draw_byte.assert_has_calls([
-            mock.call(0x01, 0x03, 0xF0),
-            mock.call(0x01, 0x04, 0xBB),
-            mock.call(0x01, 0x05, 0xA7)
-        ])
-        
-        self.assertEqual(self.chip8.registers["v"][0xF], 0x0)
+        self.assertEqual(self.chip8.V[0xF], 0x0)
         
     def test_draw_bytes_collision(self):
         """
@@ -690,28 +496,50 @@ class TestChip8CPU(unittest.TestCase):
         Draws a sprite at coordinate (Vx, Vy) with width 8 pixels and height n pixels.
         """
         
-        self.chip8.display = MagicMock()
-        self.chip8.display.draw_byte.return_value = True
+        self.chip8.display = FakeDisplay(collision=True)
+        
+        self.chip8.V[0xE] = 0x10
+        self.chip8.V[0x4] = 0x0A
         
-        nibble_dict = {
-            "second": 0xE,
-            "third": 0x4,
-            "fourth": 0x1
-        }
+        self.chip8.I = 0x10C
         
-        self.chip8.registers["v"][0xE] = 0x10
-        self.chip8.registers["v"][0x4] = 0x0A
+        self.chip8.load_memory(self.chip8.I, b"\xEE")
         
-        self.chip8.registers["i"] = 0x10C
+        self.chip8.draw_bytes(*self.operands(0xDE41))
+        
+        self.assertEqual(self.chip8.display.calls, [(0x10, 0x0A, bytes([0xEE]))])
+        
+        self.assertEqual(self.chip8.V[0xF], 0x1)
+
+    def test_draw_bytes_past_end_of_memory(self):
+        """
+        Test Opcode Dxyn - DRW Vx, Vy, nibble
+        Test with the sprite running past the end of memory
         
-        self.chip8.memory[self.chip8.registers["i"]] = 0xEE
+        Draws a sprite at coordinate (Vx, Vy) with width 8 pixels and height n pixels.
+        """
         
-        self.chip8.draw_bytes(nibble_dict)
+        self.chip8.display = FakeDisplay()
         
-        self.chip8.display.draw_byte.assert_called_with(0x10, 0x0A, 0xEE)
+        self.chip8.I = 0xFFE
         
-        self.assertEqual(self.chip8.registers["v"][0xF], 0x1)
+        with self.assertRaises(IndexError):
+            self.chip8.draw_bytes(*self.operands(0xD013))
         
+        self.assertEqual(self.chip8.display.calls, [])
+
+    def test_is_key_pressed(self):
+        """
+        Test key checks read the keyboard state captured for the frame
+        """
+
+        keys_pressed = {value: False for value in self.chip8.KEY_MAPPINGS.values()}
+        keys_pressed[self.chip8.KEY_MAPPINGS[0xC]] = True
+        self.chip8.keys_pressed = keys_pressed
+
+        self.assertTrue(self.chip8.is_key_pressed(0xC))
+        self.assertFalse(self.chip8.is_key_pressed(0x1))
+
     @patch.object(Chip8CPU, "is_key_pressed")
     def test_skip_on_keypress_pressed(self, is_key_pressed_mock: MagicMock):
         """
@@ -723,17 +551,13 @@ class TestChip8CPU(unittest.TestCase):
         
         is_key_pressed_mock.return_value = True
         
-        opcode_nibbles = {
-            "second": 0xE,
-        }
-        
-        self.chip8.registers["v"][0xE] = 0xF
+        self.chip8.V[0xE] = 0xF
         
-        self.chip8.skip_on_keypress(opcode_nibbles)
+        self.chip8.skip_on_keypress(*self.operands(0xEE9E))
         
         is_key_pressed_mock.assert_called_with(0xF)
         
-        self.assertEqual(self.chip8.registers["pc"], 0x202)
+        self.assertEqual(self.chip8.pc, 0x202)
         
     @patch.object(Chip8CPU, "is_key_pressed")
     def test_skip_on_keypress_not_pressed(self, is_key_pressed_mock: MagicMock):
@@ -746,18 +570,105 @@ class TestChip8CPU(unittest.TestCase):
         
         is_key_pressed_mock.return_value = False
         
-        opcode_nibbles = {
-            "second": 0xE,
-        }
+        self.chip8.V[0xE] = 0xF
         
-        self.chip8.registers["v"][0xE] = 0xF
-        
-        self.chip8.skip_on_keypress(opcode_nibbles)
+        self.chip8.skip_on_keypress(*self.operands(0xEE9E))
         
         is_key_pressed_mock.assert_called_with(0xF)
         
-        self.assertEqual(self.chip8.registers["pc"], 0x200)
+        self.assertEqual(self.chip8.pc, 0x200)
+
+
+    @patch.object(Chip8CPU, "wait_and_get_key")
+    def test_wait_for_input(self, wait_and_get_key_mock: MagicMock):
+        """
+        Test Opcode Fx0A - LD Vx, K
+
+        Wait for a key press, store the value of the key in Vx.
+        """
+
+        wait_and_get_key_mock.return_value = self.chip8.KEY_MAPPINGS[0xC]
+        self.chip8.display = FakeDisplay()
+
+        self.chip8.wait_for_input(*self.operands(0xF50A))
+
+        self.assertEqual(self.chip8.V[0x5], 0xC)
+
+    def test_add_i_with_reg(self):
+        """
+        Test Opcode Fx1E - ADD I, Vx
+
+        Set I = I + Vx, wrapping at 16 bits.
+        """
+
+        self.chip8.V[0x4] = 0x20
+        self.chip8.I = 0xFFF0
+
+        self.chip8.add_i_with_reg(*self.operands(0xF41E))
+
+        self.assertEqual(self.chip8.I, 0x0010)
+
+    def test_ld_i_font_sprite(self):
+        """
+        Test Opcode Fx29 - LD F, Vx
+
+        Set I to the location of the sprite for the character in Vx.
+        """
+
+        self.chip8.V[0x3] = 0xA
+
+        self.chip8.ld_i_font_sprite(*self.operands(0xF329))
+
+        self.assertEqual(self.chip8.I, self.chip8.FONT_ADDR_START + 0xA * 5)
+        self.assertEqual(self.chip8.memory[self.chip8.I], 0xF0)
+
+    def test_ld_i_bcd_of_reg(self):
+        """
+        Test Opcode Fx33 - LD B, Vx
+
+        Load the BCD representation of Vx into memory locations I, I+1, and I+2.
+        """
+
+        self.chip8.V[0x7] = 199
+        self.chip8.I = 0x300
+
+        self.chip8.ld_i_bcd_of_reg(*self.operands(0xF733))
+
+        self.assertEqual(list(self.chip8.memory[0x300:0x303]), [1, 9, 9])
+
+    def test_store_regs_at_i(self):
+        """
+        Test Opcode Fx55 - LD [I], Vx
+        
+        Store registers V0 through Vx in memory starting at location I.
+        """
+        
+        self.chip8.V[0x0] = 0x11
+        self.chip8.V[0x1] = 0x22
+        self.chip8.V[0x2] = 0x33
+        self.chip8.V[0x3] = 0x44
+        
+        self.chip8.I = 0x300
+        
+        self.chip8.store_regs_at_i(*self.operands(0xF255))
+        
+        self.assertEqual(list(self.chip8.memory[0x300:0x304]), [0x11, 0x22, 0x33, 0x00])
+
+    def test_ld_regs_at_i(self):
+        """
+        Test Opcode Fx65 - LD Vx, [I]
+        
+        Load registers V0 through Vx from memory starting at location I.
+        """
+        
+        self.chip8.load_memory(0x400, b"\xAA\xBB\xCC\xDD")
+        
+        self.chip8.I = 0x400
+        
+        self.chip8.ld_regs_at_i(*self.operands(0xF265))
         
+        self.assertEqual(list(self.chip8.V[0x0:0x4]), [0xAA, 0xBB, 0xCC, 0x00])
+        self.assertEqual(len(self.chip8.V), 16)
         
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,74 @@
+import os
+import sys
+import unittest
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../")
+
+from chip8.Chip8Display import Chip8Display
+
+class TestChip8Display(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestChip8Display, self).__init__(*args, **kwargs)
+
+    def setUp(self):
+        self.display = Chip8Display(64, 32)
+
+    def lit_pixels(self):
+        """
+        Return the (x, y) coordinates of every lit pixel in the framebuffer
+        """
+
+        return [
+            (index % self.display.width, index // self.display.width)
+            for index, pixel in enumerate(self.display.fb) if pixel
+        ]
+
+    def test_draw_sprite_no_collision(self):
+        """
+        Test drawing a sprite onto an empty framebuffer
+        """
+
+        overwritten = self.display.draw_sprite(0x02, 0x01, bytearray([0xC0, 0x01]))
+
+        self.assertFalse(overwritten)
+        self.assertEqual(self.lit_pixels(), [(0x02, 0x01), (0x03, 0x01), (0x09, 0x02)])
+
+    def test_draw_sprite_collision(self):
+        """
+        Test drawing a sprite over lit pixels erases them and reports a collision
+        """
+
+        self.display.draw_sprite(0x00, 0x00, bytearray([0xF0]))
+
+        overwritten = self.display.draw_sprite(0x00, 0x00, bytearray([0x30]))
+
+        self.assertTrue(overwritten)
+        self.assertEqual(self.lit_pixels(), [(0x00, 0x00), (0x01, 0x00)])
+
+    def test_draw_sprite_empty_row(self):
+        """
+        Test that empty sprite rows are skipped without erasing pixels
+        """
+
+        self.display.draw_sprite(0x00, 0x01, bytearray([0x81]))
+
+        overwritten = self.display.draw_sprite(0x00, 0x00, bytearray([0x81, 0x00, 0x01]))
+
+        self.assertFalse(overwritten)
+        self.assertEqual(
+            self.lit_pixels(),
+            [(0x00, 0x00), (0x07, 0x00), (0x00, 0x01), (0x07, 0x01), (0x07, 0x02)]
+        )
+
+    def test_draw_sprite_wraps(self):
+        """
+        Test that sprites drawn past the edge wrap around the screen
+        """
+
+        self.display.draw_sprite(0x3F, 0x1F, bytearray([0xC0, 0x80]))
+
+        self.assertEqual(self.lit_pixels(), [(0x3F, 0x00), (0x00, 0x1F), (0x3F, 0x1F)])
+
+
+if __name__ == "__main__":
+    unittest.main()
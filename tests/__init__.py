@@ -0,0 +1,5 @@
+import os
+
+# Run pygame headless so test processes never open a window and can run side by side
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")